@@ -1,19 +1,34 @@
+import argparse
+import importlib.util
+import functools
+import hashlib
+import shutil
+import tempfile
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
+import re
 from datetime import datetime, timedelta
-import xarray as xr
-from tqdm import tqdm
-from urllib.parse import urlparse, unquote
+import threading
+from urllib.parse import urlparse, unquote, urlencode
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import chain
+import multiprocessing
 
-try:
-    import earthaccess
-    EARTHACCESS_AVAILABLE = True
-except ImportError:
-    EARTHACCESS_AVAILABLE = False
+# --- EARTHACCESS AVAILABILITY CHECK ---
+# earthaccess pulls in fsspec, s3fs and auth stacks on import, so only check
+# that it is installed here and defer the import until a download needs it.
+EARTHACCESS_AVAILABLE = importlib.util.find_spec('earthaccess') is not None
+if not EARTHACCESS_AVAILABLE:
     print("Warning: earthaccess not installed. Download functionality will be limited.")
     print("Install with: pip install earthaccess")
 
+_earthaccess = None
+# ---------------------------------------
+
 # --- DOTENV IMPORT FOR CREDENTIAL LOADING ---
 try:
     from dotenv import load_dotenv, find_dotenv
@@ -22,24 +37,122 @@ except ImportError:
     DOTENV_AVAILABLE = False
 # --------------------------------------------
 
+# --- IJSON IMPORT FOR STREAMING GRANULE PARSING ---
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+    JSON_PARSE_ERRORS = (ValueError, ijson.JSONError)
+except ImportError:
+    IJSON_AVAILABLE = False
+    JSON_PARSE_ERRORS = (ValueError,)
+# --------------------------------------------------
+
+# --- ORJSON IMPORT FOR FAST RESPONSE PARSING ---
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+# ------------------------------------------------
+
+# --- AIOHTTP AVAILABILITY CHECK FOR CONCURRENT GRANULE SEARCHES ---
+# aiohttp (and asyncio with it) is only needed for multi-collection searches,
+# so only check that it is installed and import it when a bulk search runs.
+AIOHTTP_AVAILABLE = importlib.util.find_spec('aiohttp') is not None
+# -------------------------------------------------------------------
+
 # --- DIRECTORY STRUCTURE DEFINITIONS ---
 BASE_DATA_DIR = './data'
 RESULTS_DIR = os.path.join(BASE_DATA_DIR, 'results')
 DOWNLOADS_BASE_DIR = os.path.join(BASE_DATA_DIR, 'results_downloads')
 # ----------------------------------------
 
-# Seattle bounding box coordinates
-SEATTLE_BBOX = {
-    'west': -123.0,
-    'south': 47.0,
-    'east': -122.0,
-    'north': 48.0
-}
+# Default number of concurrent granule downloads; 5 stays within the fair-use
+# level NASA DAACs tolerate without answering 429 Too Many Requests
+DEFAULT_DOWNLOAD_THREADS = 5
+
+# --- CMR METADATA CACHE ---
+# Collection metadata changes on the order of weeks, so reuse the last search
+# result for a day instead of re-querying CMR on every run. Granule searches
+# are keyed by their full query; the newest day in a range keeps filling in
+# as granules are ingested, so those results expire much sooner.
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'nc-read')
+COLLECTIONS_CACHE_TTL = 24 * 60 * 60  # seconds
+GRANULES_CACHE_TTL = 60 * 60  # seconds
+# ---------------------------
+
+# Seattle bounding box coordinates (west, south, east, north); a tuple so it
+# cannot be mutated, with the CMR query string built once at import
+SEATTLE_BBOX = (-123.0, 47.0, -122.0, 48.0)
+SEATTLE_BBOX_STR = ",".join(str(coord) for coord in SEATTLE_BBOX)
 
 # NASA CMR API endpoints
 CMR_COLLECTIONS_URL = "https://cmr.earthdata.nasa.gov/search/collections.json"
 CMR_GRANULES_URL = "https://cmr.earthdata.nasa.gov/search/granules.json"
 
+# CMR platform short names searched, mapped to the label shown to the user
+CMR_PLATFORM_LABELS = {
+    'PACE': 'PACE / OCI',
+    'NOAA-21': 'NOAA-21 VIIRS',
+    'JPSS-2': 'NOAA-21 VIIRS (JPSS-2)',
+    'NOAA-20': 'NOAA-20 VIIRS',
+    'Suomi-NPP': 'Suomi NPP VIIRS'
+}
+
+# Link relation CMR uses for a granule's data file
+DATA_LINK_REL = 'http://esipfed.org/ns/fedsearch/1.1/data#'
+
+BYTES_PER_MB = 1048576.0
+
+# One part of a selection like '1,3,5-7': a single index or a range
+SELECTION_PART_RE = re.compile(r'\s*(\d+)\s*(?:-\s*(\d+)\s*)?')
+
+# Short-name substrings used by filter_collections
+AEROSOL_TERMS = ('AER', 'AOD', 'AE')
+OCEAN_COLOR_TERMS = ('OC', 'CHL', 'CARBON')
+
+# Largest page CMR will serve; further pages are fetched via CMR-Search-After
+CMR_MAX_PAGE_SIZE = 2000
+
+# One faceted query covers every platform/instrument combination, so CMR
+# does the filtering server-side instead of 5 separate keyword scans.
+COLLECTION_SEARCH_PARAMS = {
+    'platform[]': list(CMR_PLATFORM_LABELS),
+    'instrument[]': ['OCI', 'VIIRS'],
+    'keyword': 'aerosol',
+    'page_size': 200
+}
+
+# --- SHARED HTTP SESSION FOR CMR QUERIES ---
+# All CMR searches hit the same host, so reuse one keep-alive connection pool
+# instead of paying a fresh TCP+TLS handshake on every requests.get() call.
+CMR_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+# CMR throttling (429) and transient gateway errors are retried with
+# exponential backoff, on the requests session and the aiohttp bulk path alike
+CMR_RETRIES = 3
+CMR_RETRY_BACKOFF = 0.3  # seconds, doubled on each further attempt
+CMR_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+CMR_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',  # CMR JSON compresses 5-10x on the wire
+    'User-Agent': 'nc-read/1.0'
+}
+
+SESSION = requests.Session()
+SESSION.headers.update(CMR_HEADERS)
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=16,
+    # Retry CMR throttling (429) and transient gateway errors with backoff;
+    # after the last attempt hand back the response so _check_cmr_response
+    # can report CMR's error body.
+    max_retries=Retry(total=CMR_RETRIES, backoff_factor=CMR_RETRY_BACKOFF,
+                      status_forcelist=list(CMR_RETRY_STATUSES),
+                      raise_on_status=False)
+))
+# -------------------------------------------
+
 def display_satellite_info():
     """Display information about what each satellite measures for urban health"""
     print("\n" + "="*80)
@@ -69,58 +182,161 @@ NOAA-20 & Suomi NPP VIIRS (2017 & 2011-present)
 """)
     print("="*80)
 
-def search_aerosol_collections():
+def _parse_json(content):
+    """Decodes a JSON response body (bytes), using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def _dump_json(obj):
+    """Encodes obj as compact UTF-8 JSON bytes, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+def _check_cmr_response(response):
+    """
+    Raises requests.HTTPError for any non-200 CMR response.
+    
+    CMR only ever answers searches with 200 on success and explains failures in
+    the body, so include the start of it in the error instead of just the reason.
+    """
+    if response.status_code != 200:
+        raise requests.exceptions.HTTPError(
+            f"CMR {response.status_code}: {response.text[:200]}", response=response
+        )
+
+def _read_json_cache(cache_file, ttl=None):
+    """
+    Returns the cached JSON payload if the file exists and is younger than ttl
+    seconds (any age when ttl is None), otherwise None.
+    """
+    try:
+        if ttl is not None and time.time() - os.path.getmtime(cache_file) > ttl:
+            return None
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json_cache(cache_file, payload):
+    """Atomically writes payload to cache_file (temp file + os.replace)."""
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=cache_dir, suffix='.tmp', delete=False) as tmp:
+            json.dump(payload, tmp)
+        os.replace(tmp.name, cache_file)
+    except OSError as e:
+        print(f"  ⚠️ Could not write cache file {cache_file}: {e}")
+
+def cache_collections(func):
+    """
+    Caches a collection search on disk for COLLECTIONS_CACHE_TTL seconds.
+    
+    The cache file is keyed by a hash of COLLECTION_SEARCH_PARAMS, so changing
+    the query automatically invalidates it. Pass refresh=True to bypass it and
+    download the full result again.
+    
+    Once an entry is stale the search is revalidated with the ETag CMR
+    returned last time; a 304 Not Modified answer reuses the
+    cached copy and restarts its TTL without downloading or parsing a body.
+    The wrapped function takes etag= and returns (collections, etag), with
+    collections set to None for a 304.
+    """
+    @functools.wraps(func)
+    def wrapper(refresh=False):
+        query_key = json.dumps(COLLECTION_SEARCH_PARAMS, sort_keys=True)
+        digest = hashlib.sha1(query_key.encode('utf-8')).hexdigest()
+        cache_file = os.path.join(CACHE_DIR, f"collections_{digest}.json")
+        etags_file = os.path.join(CACHE_DIR, 'etags.json')
+        
+        if not refresh:
+            cached = _read_json_cache(cache_file, COLLECTIONS_CACHE_TTL)
+            if cached is not None:
+                print(f"✓ Loaded {len(cached)} collection(s) from cache: {cache_file}")
+                print("  (Run with --refresh to query CMR again)")
+                return cached
+        
+        # Only revalidate when there is still a cached body to fall back on;
+        # refresh asks for the full result, so no If-None-Match then
+        stale = _read_json_cache(cache_file)
+        etags = _read_json_cache(etags_file) or {}
+        etag = etags.get(digest) if stale is not None and not refresh else None
+        
+        collections, new_etag = func(etag=etag)
+        
+        if collections is None:
+            print(f"✓ Collections unchanged on CMR; reusing {len(stale)} cached collection(s)")
+            try:
+                os.utime(cache_file)  # restart the TTL
+            except OSError:
+                pass
+            return stale
+        
+        if collections:
+            _write_json_cache(cache_file, collections)
+            if new_etag:
+                etags[digest] = new_etag
+                _write_json_cache(etags_file, etags)
+        return collections
+    
+    return wrapper
+
+def _granule_cache_file(params):
+    """Cache file for one granule query, keyed by a hash of its sorted parameters."""
+    query_key = f"{CMR_GRANULES_URL}?{urlencode(sorted(params.items()))}"
+    digest = hashlib.sha1(query_key.encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, f"granules_{digest}.json")
+
+def _platform_label(collection):
+    """Map a collection's CMR platform short names to a display label."""
+    platforms = collection.get('platforms', [])
+    for cmr_platform, label in CMR_PLATFORM_LABELS.items():
+        if cmr_platform in platforms:
+            return label
+    return 'Unknown'
+
+@cache_collections
+def search_aerosol_collections(etag=None):
     """Search for NOAA-21 VIIRS and PACE OCI aerosol collections"""
     print("Searching for aerosol data collections...")
     
-    all_collections = []
+    print("\nSearching multiple satellite platforms...")
     
-    # Search queries for different satellites
-    search_queries = [
-        ('PACE OCI aerosol', 'PACE / OCI'),
-        ('NOAA-21 VIIRS aerosol', 'NOAA-21 VIIRS'),
-        ('JPSS-2 VIIRS aerosol', 'NOAA-21 VIIRS (JPSS-2)'),
-        ('NOAA-20 VIIRS aerosol', 'NOAA-20 VIIRS'),
-        ('Suomi NPP VIIRS aerosol', 'Suomi NPP VIIRS')
-    ]
+    headers = {'If-None-Match': etag} if etag else {}
     
-    print("\nSearching multiple satellite platforms...")
+    try:
+        response = SESSION.get(CMR_COLLECTIONS_URL, params=COLLECTION_SEARCH_PARAMS,
+                               headers=headers, timeout=CMR_TIMEOUT)
+        if response.status_code == 304:
+            return None, etag
+        _check_cmr_response(response)
+        data = _parse_json(response.content)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"  ✗ Error searching collections: {e}")
+        return [], None
     
-    for keyword, platform_name in search_queries:
-        params = {
-            'keyword': keyword,
-            'page_size': 50
-        }
-        
-        try:
-            response = requests.get(CMR_COLLECTIONS_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            collections = data.get('feed', {}).get('entry', [])
-            
-            if collections:
-                print(f"  ✓ Found {len(collections)} collection(s) for {platform_name}")
-                # Tag each collection with the platform for easier identification
-                for col in collections:
-                    col['_platform'] = platform_name
-                all_collections.extend(collections)
-            else:
-                print(f"  - No collections for {platform_name}")
-            
-        except requests.exceptions.RequestException as e:
-            print(f"  ✗ Error searching {platform_name}: {e}")
+    collections = data.get('feed', {}).get('entry', [])
+    
+    # Tag each collection with the platform for easier identification
+    for col in collections:
+        col['_platform'] = _platform_label(col)
     
-    # Remove duplicates based on short_name
-    seen_names = set()
-    unique_collections = []
-    for col in all_collections:
-        short_name = col.get('short_name')
-        if short_name and short_name not in seen_names:
-            seen_names.add(short_name)
-            unique_collections.append(col)
+    for label in CMR_PLATFORM_LABELS.values():
+        count = sum(1 for col in collections if col['_platform'] == label)
+        if count:
+            print(f"  ✓ Found {count} collection(s) for {label}")
+        else:
+            print(f"  - No collections for {label}")
     
-    return unique_collections
+    # Remove duplicates based on short_name (first occurrence wins, order kept)
+    unique_collections = {}
+    for col in collections:
+        if col.get('short_name'):
+            unique_collections.setdefault(col['short_name'], col)
+    
+    return list(unique_collections.values()), response.headers.get('ETag')
 
 def filter_collections(collections):
     """Filters collections to only include L3 products and relevant aerosol products."""
@@ -129,17 +345,19 @@ def filter_collections(collections):
     for col in collections:
         short_name = col.get('short_name', '').upper()
         
-        # 1. Filter for L3
-        is_l3 = 'L3' in short_name
+        # 1. Filter for L3 (cheapest test, and rejects most collections)
+        if 'L3' not in short_name:
+            continue
         
         # 2. Filter for "Good" aerosol product (AER/AOD/AE)
-        is_aerosol = any(term in short_name for term in ['AER', 'AOD', 'AE'])
+        if not any(term in short_name for term in AEROSOL_TERMS):
+            continue
         
         # 3. Filter out "Bad" ocean color products (OC/CHL/CARBON)
-        is_ocean_color = any(term in short_name for term in ['OC', 'CHL', 'CARBON'])
+        if any(term in short_name for term in OCEAN_COLOR_TERMS):
+            continue
         
-        if is_l3 and is_aerosol and not is_ocean_color:
-            filtered.append(col)
+        filtered.append(col)
             
     print(f"  ✓ Filtered down to {len(filtered)} relevant collections.")
     return filtered
@@ -161,16 +379,15 @@ def display_collections_paginated(collections, page_size=25):
         print(f"\nShowing collections {start + 1}-{end} of {total}:")
         print("="*80)
         
-        for i in range(start, end):
-            collection = collections[i]
+        for number, collection in enumerate(collections[start:end], start + 1):
             title = collection.get('title', 'No title')
             short_name = collection.get('short_name', 'N/A')
             platform = collection.get('_platform', 'Unknown')
             summary = collection.get('summary', 'No description')[:100]
             
-            print(f"\n{i + 1}. [{platform}] {title}")
-            print(f"  Short Name: **{short_name}**")
-            print(f"  Description: {summary}...")
+            print(f"\n{number}. [{platform}] {title}\n"
+                  f"  Short Name: **{short_name}**\n"
+                  f"  Description: {summary}...")
         
         start = end
         
@@ -181,45 +398,239 @@ def display_collections_paginated(collections, page_size=25):
         
     return
 
-def search_granules(short_name, start_date=None, end_date=None):
-    """Search for data granules for a specific collection over Seattle"""
+def _granule_search_params(short_name, start_date=None, end_date=None):
+    """
+    Builds the CMR granule query for one collection over Seattle.
     
+    Returns:
+        tuple: (params, start_date, end_date) with the default 7-day range applied.
+    """
     # Default to last 7 days if no dates provided
     if not end_date:
         end_date = datetime.now()
     if not start_date:
         start_date = end_date - timedelta(days=7)
     
-    # Format dates for CMR API
-    temporal = f"{start_date.strftime('%Y-%m-%dT00:00:00Z')},{end_date.strftime('%Y-%m-%dT23:59:59Z')}"
-    
-    bbox_str = f"{SEATTLE_BBOX['west']},{SEATTLE_BBOX['south']},{SEATTLE_BBOX['east']},{SEATTLE_BBOX['north']}"
+    # Format dates for CMR API (ISO-8601; isoformat avoids strftime's locale path)
+    temporal = f"{start_date.date().isoformat()}T00:00:00Z,{end_date.date().isoformat()}T23:59:59Z"
     
     params = {
         'short_name': short_name,
-        'bounding_box': bbox_str,
+        'bounding_box': SEATTLE_BBOX_STR,
         'temporal': temporal,
-        'page_size': 100
+        'page_size': CMR_MAX_PAGE_SIZE
     }
     
+    return params, start_date, end_date
+
+def search_granules(short_name, start_date=None, end_date=None, refresh=False):
+    """
+    Search for data granules for a specific collection over Seattle.
+    
+    Results are cached on disk for GRANULES_CACHE_TTL seconds; pass
+    refresh=True to query CMR regardless.
+    """
+    params, start_date, end_date = _granule_search_params(short_name, start_date, end_date)
+    
     print(f"\nSearching for granules over Seattle...")
     print(f"Date range: {start_date.date()} to {end_date.date()}")
-    print(f"Bounding box: {bbox_str}")
+    print(f"Bounding box: {params['bounding_box']}")
+    
+    cache_file = _granule_cache_file(params)
+    if not refresh:
+        cached = _read_json_cache(cache_file, GRANULES_CACHE_TTL)
+        if cached is not None:
+            print(f"\nFound {len(cached)} granules (cached)")
+            return cached
+    
+    granules = []
+    headers = {}
     
     try:
-        response = requests.get(CMR_GRANULES_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        granules = data.get('feed', {}).get('entry', [])
+        # Page through all matching granules. CMR hands back a CMR-Search-After
+        # token with each page; sending it back continues where we left off.
+        while True:
+            with SESSION.get(CMR_GRANULES_URL, params=params, headers=headers,
+                             timeout=CMR_TIMEOUT, stream=True) as response:
+                _check_cmr_response(response)
+                search_after = response.headers.get('CMR-Search-After')
+                
+                if IJSON_AVAILABLE:
+                    # Parse entries straight off the socket instead of buffering
+                    # the whole response and building the full feed dict first.
+                    response.raw.decode_content = True
+                    page = list(ijson.items(response.raw, 'feed.entry.item', use_float=True))
+                else:
+                    page = _parse_json(response.content).get('feed', {}).get('entry', [])
+            
+            granules.extend(page)
+            
+            # A short page is the last one, so skip the extra empty round trip
+            if not search_after or len(page) < params['page_size']:
+                break
+            headers = {'CMR-Search-After': search_after}
         
+        _write_json_cache(cache_file, granules)
         print(f"\nFound {len(granules)} granules")
         return granules
     
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, *JSON_PARSE_ERRORS) as e:
         print(f"Error searching granules: {e}")
         return []
 
+async def _fetch_granules_async(session, url):
+    """
+    Runs one paged CMR granule query on a shared aiohttp session. Each page
+    request is retried like the requests SESSION does (CMR_RETRY_STATUSES,
+    up to CMR_RETRIES times with exponential backoff, honoring Retry-After).
+    """
+    import asyncio
+    
+    granules = []
+    headers = {}
+    while True:
+        for attempt in range(CMR_RETRIES + 1):
+            async with session.get(url, headers=headers) as response:
+                if response.status in CMR_RETRY_STATUSES and attempt < CMR_RETRIES:
+                    retry_after = response.headers.get('Retry-After', '')
+                    delay = float(retry_after) if retry_after.isdigit() else CMR_RETRY_BACKOFF * 2 ** attempt
+                    await asyncio.sleep(delay)
+                    continue
+                # Same diagnostics as _check_cmr_response: CMR explains
+                # failures in the body
+                if response.status != 200:
+                    raise requests.exceptions.HTTPError(
+                        f"CMR {response.status}: {(await response.text())[:200]}"
+                    )
+                search_after = response.headers.get('CMR-Search-After')
+                data = _parse_json(await response.read())
+                break
+        
+        page = data.get('feed', {}).get('entry', [])
+        granules.extend(page)
+        
+        if not search_after or len(page) < CMR_MAX_PAGE_SIZE:
+            return granules
+        headers = {'CMR-Search-After': search_after}
+
+async def _search_granules_bulk_async(urls):
+    """Issues all granule queries concurrently over one connection pool."""
+    import asyncio
+    import aiohttp
+    
+    connect_timeout, read_timeout = CMR_TIMEOUT
+    timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+    connector = aiohttp.TCPConnector(limit=10)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=CMR_HEADERS) as session:
+        return await asyncio.gather(
+            *[_fetch_granules_async(session, url) for url in urls],
+            return_exceptions=True
+        )
+
+def _fetch_granules(url):
+    """Runs one paged CMR granule query on the shared SESSION (aiohttp fallback)."""
+    granules = []
+    headers = {}
+    try:
+        while True:
+            response = SESSION.get(url, headers=headers, timeout=CMR_TIMEOUT)
+            _check_cmr_response(response)
+            search_after = response.headers.get('CMR-Search-After')
+            
+            page = _parse_json(response.content).get('feed', {}).get('entry', [])
+            granules.extend(page)
+            
+            if not search_after or len(page) < CMR_MAX_PAGE_SIZE:
+                return granules
+            headers = {'CMR-Search-After': search_after}
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return e
+
+def prefetch_default_granules(short_names, refresh=False, stop=None):
+    """
+    Runs the default (last 7 days) granule search for each collection into
+    the disk cache without printing, so it can run in the background while
+    the user is still typing a date range. A following search_granules or
+    search_granules_bulk call with the default range is then a cache hit.
+    Setting the optional stop event ends it before the next collection.
+    
+    Returns:
+        bool: True if every collection now has a fresh cached result.
+    """
+    all_cached = True
+    for short_name in short_names:
+        if stop is not None and stop.is_set():
+            return False
+        params, _, _ = _granule_search_params(short_name)
+        cache_file = _granule_cache_file(params)
+        if not refresh and _read_json_cache(cache_file, GRANULES_CACHE_TTL) is not None:
+            continue
+        result = _fetch_granules(f"{CMR_GRANULES_URL}?{urlencode(params)}")
+        if isinstance(result, Exception):
+            all_cached = False
+        else:
+            _write_json_cache(cache_file, result)
+    return all_cached
+
+def search_granules_bulk(short_names, start_date=None, end_date=None, refresh=False):
+    """
+    Search for granules over Seattle for several collections at once.
+    
+    Each collection is a separate CMR round trip; with aiohttp installed they
+    run concurrently so the total wait is roughly the slowest query rather than
+    the sum. Without aiohttp the queries run one after another. Collections
+    with a fresh cached result (see search_granules) are not queried at all.
+    
+    Returns:
+        dict: Maps each short name to its list of granules (empty on error).
+    """
+    params, start_date, end_date = _granule_search_params(None, start_date, end_date)
+    
+    # Only short_name differs between the queries, so encode the shared
+    # bbox/temporal/page_size part of the URL once and append each name.
+    del params['short_name']
+    base_url = f"{CMR_GRANULES_URL}?{urlencode(params)}"
+    
+    print(f"\nSearching for granules over Seattle in {len(short_names)} collections...")
+    print(f"Date range: {start_date.date()} to {end_date.date()}")
+    print(f"Bounding box: {params['bounding_box']}")
+    
+    results = {}
+    cache_files = {name: _granule_cache_file(dict(params, short_name=name)) for name in short_names}
+    if not refresh:
+        for short_name in short_names:
+            cached = _read_json_cache(cache_files[short_name], GRANULES_CACHE_TTL)
+            if cached is not None:
+                print(f"  ✓ Found {len(cached)} granule(s) for {short_name} (cached)")
+                results[short_name] = cached
+    
+    pending = [name for name in short_names if name not in results]
+    urls = [f"{base_url}&{urlencode({'short_name': name})}" for name in pending]
+    
+    if not urls:
+        responses = []
+    elif AIOHTTP_AVAILABLE:
+        import asyncio
+        responses = asyncio.run(_search_granules_bulk_async(urls))
+    else:
+        responses = [_fetch_granules(url) for url in urls]
+    
+    for short_name, result in zip(pending, responses):
+        if isinstance(result, Exception):
+            print(f"  ✗ Error searching {short_name}: {result}")
+            results[short_name] = []
+        else:
+            print(f"  ✓ Found {len(result)} granule(s) for {short_name}")
+            _write_json_cache(cache_files[short_name], result)
+            results[short_name] = result
+    
+    # Keep the caller's collection order regardless of which were cached
+    results = {name: results[name] for name in short_names}
+    
+    total = sum(len(granules) for granules in results.values())
+    print(f"\nFound {total} granules")
+    return results
+
 def display_granule_info(granules):
     """Display information about found granules"""
     if not granules:
@@ -237,24 +648,24 @@ def display_granule_info(granules):
         time_start = granule.get('time_start', 'N/A')
         granule_id = granule.get('id', 'N/A')
         
-        # Get file size if available
+        # Get file size and download link in a single pass over the links
         size_mb = None
-        for link in granule.get('links', []):
-            if 'inherited' in link and link['inherited'] == False:
-                size_mb = link.get('length', 0) / (1024 * 1024) # Convert to MB
+        download_url = None
+        for link in granule.get('links', ()):
+            if download_url is None and link.get('rel') == DATA_LINK_REL:
+                download_url = link.get('href')
+            if size_mb is None and link.get('inherited') is False and 'length' in link:
+                size_mb = link['length'] / BYTES_PER_MB # Convert to MB
+            if download_url is not None and size_mb is not None:
                 break
         
-        # Get download links
-        links = granule.get('links', [])
-        download_links = [link['href'] for link in links if link.get('rel') == 'http://esipfed.org/ns/fedsearch/1.1/data#']
-        
         granule_info = {
             'index': i,
             'title': title,
             'id': granule_id,
             'time': time_start,
             'size_mb': size_mb,
-            'download_url': download_links[0] if download_links else None
+            'download_url': download_url
         }
         granule_list.append(granule_info)
         
@@ -262,63 +673,186 @@ def display_granule_info(granules):
         print(f"  Time: {time_start}")
         if size_mb:
             print(f"  Size: {size_mb:.2f} MB")
-        if download_links:
-            print(f"  Download URL: {download_links[0][:80]}...")
+        if download_url:
+            print(f"  Download URL: {download_url[:80]}...")
     
     return granule_list
 
+def write_json_array(output_file, items):
+    """
+    Writes a list of dicts as a JSON array, one compact entry per line.
+    
+    Each entry is encoded on its own (orjson when installed, otherwise the
+    C-accelerated json.dumps) and written straight to the file, so the whole
+    document is never built in memory.
+    """
+    with open(output_file, 'wb') as f:
+        f.write(b'[\n')
+        for i, item in enumerate(items):
+            if i:
+                f.write(b',\n')
+            f.write(_dump_json(item))
+        f.write(b'\n]\n')
+
+def _get_earthaccess():
+    """Imports earthaccess on first use and caches the module."""
+    global _earthaccess
+    if _earthaccess is None:
+        import earthaccess
+        _earthaccess = earthaccess
+    return _earthaccess
+
 def get_granule_id_from_url(file_path):
     """Extracts the granule ID from the downloaded file path for logging."""
     return os.path.basename(file_path)
 
-def check_file_contents(file_path):
-    """Check if NetCDF file has actual data (not a placeholder)"""
+def _check_file_contents(file_path):
+    """
+    Checks a NetCDF file without printing, so it can run in a worker process.
+    
+    Returns:
+        tuple: (is_valid, report_lines) where report_lines are printed by the caller.
+    """
     file_id = get_granule_id_from_url(file_path)
-    print(f"\nChecking file: **{file_id}**")
+    lines = [f"\nChecking file: **{file_id}**"]
+    
+    # Deferred so startup and search-only runs never pay the import cost
+    import netCDF4
     
     try:
-        # Use decode_times=False to avoid time parsing errors in large datasets
-        ds = xr.open_dataset(file_path, decode_times=False)
-        
-        num_vars = len(ds.data_vars)
-        
-        # Check for the Ocean Color signature: no data variables over land
-        if num_vars == 0:
-            print("  ❌ WARNING: File has **zero** data variables. This confirms it's a **placeholder**.")
-            print("  Reason: Likely an **Ocean Color (OC)** product filtered over land.")
-            ds.close()
-            return False
+        # Only header metadata (variable names and shapes) is needed, so read it
+        # straight from netCDF4; no array values are touched. Each call runs in
+        # its own validation process (see download_granules), so no lock is
+        # needed around the non-thread-safe netCDF-C library.
+        with netCDF4.Dataset(file_path, 'r') as ds:
+            # Data variables are everything that is not a dimension coordinate
+            num_vars = sum(1 for name in ds.variables if name not in ds.dimensions)
             
-        print(f"  ✅ Variables found: {num_vars}")
-        
-        # Check if the primary variable is empty (e.g., all NaNs or size 1)
-        is_valid = False
-        for var_name in ds.data_vars:
-            # Skip coordinate variables if they sneak into data_vars
-            if var_name in ds.coords:
-                continue
+            # Check for the Ocean Color signature: no data variables over land
+            if num_vars == 0:
+                lines.append("  ❌ WARNING: File has **zero** data variables. This confirms it's a **placeholder**.")
+                lines.append("  Reason: Likely an **Ocean Color (OC)** product filtered over land.")
+                return False, lines
+                
+            lines.append(f"  ✅ Variables found: {num_vars}")
             
-            # Check if the variable size is greater than 1 (to filter out scalar variables)
-            if ds[var_name].size > 1:
-                is_valid = True
-                print(f"  - Primary variable **{var_name}** with shape {ds[var_name].shape} found.")
-                break # Found a valid variable, no need to check others
-
-        ds.close()
-        return is_valid
+            # Find the first non-scalar data variable, stopping as soon as one is
+            # found (size > 1 filters out scalar/flag variables)
+            primary = next(
+                (variable for name, variable in ds.variables.items()
+                 if name not in ds.dimensions and variable.size > 1),
+                None
+            )
+            is_valid = primary is not None
+            if is_valid:
+                lines.append(f"  - Primary variable **{primary.name}** with shape {primary.shape} found.")
+        
+        return is_valid, lines
         
     except Exception as e:
-        print(f"  ❌ ERROR: Could not read file content. Check file integrity.")
-        print(f"  Error details: {e}")
+        lines.append(f"  ❌ ERROR: Could not read file content. Check file integrity.")
+        lines.append(f"  Error details: {e}")
+        return False, lines
+
+def check_file_contents(file_path):
+    """Check if NetCDF file has actual data (not a placeholder)"""
+    is_valid, lines = _check_file_contents(file_path)
+    print("\n".join(lines))
+    return is_valid
+
+def _index_existing_downloads(*directories):
+    """Maps file name -> path for every non-empty file already under the given directories."""
+    existing = {}
+    pending = list(directories)
+    while pending:
+        # scandir entries carry the file type from the directory listing, so
+        # only regular files cost a stat() (for their size)
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name not in existing and entry.is_file() and entry.stat().st_size > 0:
+                    existing[entry.name] = entry.path
+    return existing
+
+def _reported_file_sizes(granule):
+    """Maps file name -> size in bytes for the granule's files that CMR reports an exact size for."""
+    try:
+        infos = granule['umm']['DataGranule']['ArchiveAndDistributionInformation']
+    except (KeyError, TypeError):
+        return {}
+    return {
+        info['Name']: int(info['SizeInBytes'])
+        for info in infos
+        if isinstance(info, dict) and 'Name' in info and 'SizeInBytes' in info
+    }
+
+def _is_complete_download(granule, paths_by_name):
+    """
+    True if the local files match the sizes CMR reports for the granule: the
+    exact byte count per file where known, otherwise the granule's total
+    size (granule.size(), in MB). A file cut short by an interrupted run
+    fails the check; so does a granule without any reported size.
+    """
+    sizes = {name: os.path.getsize(path) for name, path in paths_by_name.items()}
+    reported = _reported_file_sizes(granule)
+    if all(name in reported for name in sizes):
+        return all(sizes[name] == reported[name] for name in sizes)
+    
+    try:
+        total_mb = float(granule.size())
+    except Exception:
         return False
+    if total_mb <= 0:
+        return False
+    # Sizes in MB are rounded in CMR metadata
+    return abs(sum(sizes.values()) / 1024 / 1024 - total_mb) <= max(0.01, total_mb * 0.001)
+
+def _reuse_existing_download(granule, existing, output_dir):
+    """
+    Returns local paths for a granule whose data files are all in `existing`
+    with the sizes CMR reports, hard-linked (or copied, across filesystems)
+    into output_dir, or None if any of them still has to be downloaded.
+    """
+    try:
+        names = [os.path.basename(urlparse(link).path) for link in granule.data_links()]
+    except Exception:
+        return None
+    if not names or any(name not in existing for name in names):
+        return None
+    try:
+        if not _is_complete_download(granule, {name: existing[name] for name in names}):
+            return None
+    except OSError:
+        return None
+    
+    paths = []
+    for name in names:
+        target = os.path.join(output_dir, name)
+        if os.path.exists(target) and not os.path.samefile(target, existing[name]):
+            # A partial file from an interrupted run in this directory
+            os.remove(target)
+        if not os.path.exists(target):
+            try:
+                os.link(existing[name], target)
+            except OSError:
+                shutil.copy2(existing[name], target)
+        paths.append(target)
+    return paths
 
-def download_granules(granule_ids, output_dir):
+def download_granules(granule_ids, output_dir, threads=DEFAULT_DOWNLOAD_THREADS):
     """
     Download granules, check their contents, and save to a timestamped directory.
     
     Args:
         granule_ids (list): List of CMR concept IDs for the granules to download.
         output_dir (str): The full path to the timestamped directory to save files in.
+        threads (int): Number of granules downloaded concurrently. Raise it on
+            fast links, lower it on slow or shared connections.
         
     Returns:
         list: A list of file paths for valid (non-placeholder) downloaded files.
@@ -327,6 +861,8 @@ def download_granules(granule_ids, output_dir):
         print("\nError: earthaccess library not installed")
         return []
     
+    earthaccess = _get_earthaccess()
+    
     # Create the timestamped output directory
     os.makedirs(output_dir, exist_ok=True)
     
@@ -344,25 +880,51 @@ def download_granules(granule_ids, output_dir):
         print(f"Found {len(granule_results)} granule(s) available for download")
         print("\nPress Ctrl+C at any time to stop downloading and check files downloaded so far.\n")
         
-        # Download files with progress bar
-        files = []
+        # Granules fetched on an earlier run (each run gets its own timestamped
+        # directory) are linked in from there instead of downloaded again.
+        downloaded_by_index = {}
+        existing = _index_existing_downloads(DOWNLOADS_BASE_DIR, output_dir)
+        for i, granule in enumerate(granule_results):
+            reused = _reuse_existing_download(granule, existing, output_dir)
+            if reused:
+                downloaded_by_index[i] = reused
+        if downloaded_by_index:
+            print(f"↺ Reusing {len(downloaded_by_index)} granule(s) already downloaded on an earlier run")
+        
+        from tqdm import tqdm
+        
+        # Download the rest concurrently. Each transfer is dominated by TLS
+        # setup and DAAC redirects, so several in flight at once keep the link
+        # busy; the pool size bounds how hard we hit the DAAC.
+        executor = ThreadPoolExecutor(max_workers=threads)
+        futures = {
+            executor.submit(earthaccess.download, granule, local_path=output_dir, threads=1): i
+            for i, granule in enumerate(granule_results)
+            if i not in downloaded_by_index
+        }
         try:
-            with tqdm(total=len(granule_results), desc="Downloading", unit="file") as pbar:
-                for granule in granule_results:
+            # Coalesce redraws; slow terminals and CI logs pay for every refresh
+            with tqdm(total=len(granule_results), initial=len(downloaded_by_index),
+                      desc="Downloading", unit="file", mininterval=0.5, smoothing=0.1) as pbar:
+                for future in as_completed(futures):
+                    i = futures[future]
                     try:
-                        downloaded = earthaccess.download(
-                            granule,
-                            local_path=output_dir
-                        )
+                        downloaded = future.result()
                         if downloaded:
-                            files.extend(downloaded if isinstance(downloaded, list) else [downloaded])
-                        pbar.update(1)
+                            downloaded_by_index[i] = downloaded if isinstance(downloaded, list) else [downloaded]
                     except Exception as e:
+                        granule = granule_results[i]
                         pbar.write(f"✗ Error downloading {granule.get('producer_granule_id', 'unknown')}: {e}")
-                        pbar.update(1)
+                    pbar.update(1)
+            executor.shutdown()
         except KeyboardInterrupt:
+            # Drop queued downloads; transfers already running finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
             print("\n\n⚠️  Download cancelled by user!")
-            print(f"Downloaded {len(files)} file(s) before cancellation.")
+            print(f"Downloaded {sum(len(f) for f in downloaded_by_index.values())} file(s) before cancellation.")
+        
+        # Keep the original granule order for the validation report
+        files = [f for i in sorted(downloaded_by_index) for f in downloaded_by_index[i]]
         
         print(f"\n✓ Downloaded {len(files)} file(s) total")
         
@@ -374,8 +936,24 @@ def download_granules(granule_ids, output_dir):
         print("CHECKING FILE CONTENTS (Data Validation):")
         print("="*80)
         
-        for file_path in files:
-            if check_file_contents(file_path):
+        # Validate files in separate processes: netCDF-C/HDF5 calls cannot run
+        # in parallel threads, but each process has its own library state.
+        # Workers return their report lines, which are printed here in file order.
+        # Workers are spawned, not forked: after Ctrl+C, download threads may
+        # still be running, and forking while they hold requests/ssl/HDF5 locks
+        # can deadlock the children. Only files of finished downloads are checked.
+        if len(files) > 1:
+            workers = min(os.cpu_count() or 1, len(files))
+            chunksize = max(1, len(files) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                results = list(executor.map(_check_file_contents, files, chunksize=chunksize))
+        else:
+            results = [_check_file_contents(file_path) for file_path in files]
+        
+        for file_path, (is_valid, lines) in zip(files, results):
+            print("\n".join(lines))
+            if is_valid:
                 valid_files.append(file_path)
             else:
                 empty_files.append(file_path)
@@ -411,6 +989,8 @@ def login_earthaccess():
         print("\nError: earthaccess library not installed")
         return False
     
+    earthaccess = _get_earthaccess()
+    
     # --- START OF DOTENV LOGIC ---
     if DOTENV_AVAILABLE:
         # Load environment variables from .env file
@@ -486,51 +1066,47 @@ def parse_granule_selection(input_str, max_index):
     Parses a string of indices and ranges (e.g., '1,3,5-7') into a set of unique integers.
     """
     selected_indices = set()
-    parts = [part.strip() for part in input_str.split(',')]
     
-    for part in parts:
-        if '-' in part:
-            # Handle range (e.g., 5-7)
-            try:
-                start, end = map(int, part.split('-'))
-                if start > end:
-                    start, end = end, start # Handle backward ranges like 7-5
-                
-                # Check for bounds and add indices (1-based)
-                for i in range(start, end + 1):
-                    if 1 <= i <= max_index:
-                        selected_indices.add(i)
-            except ValueError:
-                # Ignore invalid range parts
-                continue
-        else:
-            # Handle single index (e.g., 3)
-            try:
-                index = int(part)
-                # Check for bounds and add index (1-based)
-                if 1 <= index <= max_index:
-                    selected_indices.add(index)
-            except ValueError:
-                # Ignore invalid single index parts
-                continue
+    for part in input_str.split(','):
+        match = SELECTION_PART_RE.fullmatch(part)
+        if not match:
+            # Ignore invalid parts
+            continue
+        
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        if start > end:
+            start, end = end, start # Handle backward ranges like 7-5
+        
+        # Clip to the valid (1-based) bounds first, so a range like 1-99999
+        # never walks past max_index
+        selected_indices.update(range(max(start, 1), min(end, max_index) + 1))
                 
     # Return as a sorted list
-    return sorted(list(selected_indices))
+    return sorted(selected_indices)
 
 def get_valid_main_choice(prompt, max_options):
     """
-    Gets a valid integer choice from the user, or 'q'. Loops until valid.
-    Returns: integer (choice) or string ('q')
+    Gets a valid collection choice from the user, or 'q'. Loops until valid.
+    Accepts a single number or a list/range of numbers (e.g., '1,3,5-7').
+    Returns: list of integers (1-based choices) or string ('q')
     """
     while True:
         choice = input(prompt).strip()
         if choice.lower() == 'q':
             return 'q'
         
+        if ',' in choice or '-' in choice:
+            selected = parse_granule_selection(choice, max_options)
+            if selected:
+                return selected
+            print(f"Invalid selection. Please enter numbers/ranges between 1 and {max_options}, or 'q' to quit.")
+            continue
+        
         try:
             idx = int(choice) - 1 # Convert to 0-based index
             if 0 <= idx < max_options:
-                return int(choice)
+                return [int(choice)]
             else:
                 print(f"Invalid selection. Please enter a number between 1 and {max_options}, or 'q' to quit.")
         except ValueError:
@@ -553,7 +1129,30 @@ def get_valid_download_choice():
         else:
             print("Invalid choice. Please enter 1, 2, or 3.")
 
+def get_download_threads(default=DEFAULT_DOWNLOAD_THREADS, max_threads=32):
+    """
+    Asks how many parallel download threads to use. Blank input keeps the default.
+    Returns: integer between 1 and max_threads
+    """
+    while True:
+        choice = input(f"\nParallel download threads (1-{max_threads}, Enter for {default}): ").strip()
+        if not choice:
+            return default
+        
+        try:
+            threads = int(choice)
+            if 1 <= threads <= max_threads:
+                return threads
+            print(f"Invalid number. Please enter a value between 1 and {max_threads}.")
+        except ValueError:
+            print("Invalid input. Please enter a whole number or press Enter.")
+
 def main():
+    parser = argparse.ArgumentParser(description="Find NASA satellite aerosol data over Seattle.")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Ignore cached collection and granule searches and query CMR again")
+    args = parser.parse_args()
+    
     print("="*80)
     print("SATELLITE AEROSOL DATA FINDER FOR SEATTLE")
     print("Platforms: PACE OCI, NOAA-21, NOAA-20, Suomi NPP VIIRS")
@@ -565,7 +1164,7 @@ def main():
     input("\nPress Enter to search for aerosol/pollution data...")
     
     # Search for collections
-    collections = search_aerosol_collections()
+    collections = search_aerosol_collections(refresh=args.refresh)
     
     if not collections:
         print("\nNo collections found. Try searching manually at:")
@@ -583,65 +1182,105 @@ def main():
         return
 
     granules = []
+    prefetch_executor = ThreadPoolExecutor(max_workers=1)
+    # Background default-range granule search (see prefetch_default_granules)
+    prefetch = prefetch_names = None
+    prefetch_stop = threading.Event()
     
-    # --- Main loop for collection selection and granule search with validation ---
-    while True:
-        # Display collections with pagination and guidance
-        display_collections_paginated(collections, page_size=25)
-        
-        # Get validated choice
-        choice = get_valid_main_choice(
-            f"\nEnter **Aerosol L3** collection number (1-{len(collections)}) to search for data (or 'q' to quit): ", 
-            len(collections)
-        )
-        
-        if choice == 'q':
-            break 
-        
-        try:
-            # choice is guaranteed to be a valid integer index (1-based)
-            idx = choice - 1
-            selected = collections[idx]
-            short_name = selected.get('short_name')
-            
-            print(f"\nSelected: {selected.get('title')}")
-            
-            # Get date range (No validation loop here, simple input for now)
-            print("\nEnter date range (leave blank for last 7 days):")
-            start_input = input("Start date (YYYY-MM-DD): ").strip()
-            end_input = input("End date (YYYY-MM-DD): ").strip()
-            
-            start_date = None
-            end_date = None
-            
-            if start_input:
-                try:
-                    start_date = datetime.strptime(start_input, '%Y-%m-%d')
-                except ValueError:
-                    print("Invalid date format. Using default range.")
-            if end_input:
-                try:
-                    end_date = datetime.strptime(end_input, '%Y-%m-%d')
-                except ValueError:
-                    print("Invalid date format. Using default range.")
-
-            # Search for granules
-            granules = search_granules(short_name, start_date, end_date)
-            
-            if not granules:
-                print("\n" + "="*80)
-                print("⚠️ No granules found for the selected collection and date range.")
-                print("Returning to collection selection to try a different collection or date range.")
-                print("="*80)
-                continue # Loop continues
+    def cancel_prefetch():
+        # Drops a queued prefetch and stops a running one after its current query
+        prefetch_stop.set()
+        if prefetch is not None:
+            prefetch.cancel()
+    
+    try:
+        # --- Main loop for collection selection and granule search with validation ---
+        while True:
+            # Display collections with pagination and guidance
+            display_collections_paginated(collections, page_size=25)
             
-            # Granules found, break the loop
-            break 
+            # Get validated choice
+            choice = get_valid_main_choice(
+                f"\nEnter **Aerosol L3** collection number(s) (1-{len(collections)}, e.g. 2 or 1,3,5-7) to search for data (or 'q' to quit): ", 
+                len(collections)
+            )
             
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}. Returning to collection selection.")
-            continue
+            if choice == 'q':
+                break 
             
+            try:
+                # choice is guaranteed to be a list of valid integer indices (1-based)
+                selected = [collections[i - 1] for i in choice]
+                short_names = [col.get('short_name') for col in selected]
+                
+                for col in selected:
+                    print(f"\nSelected: {col.get('title')}")
+                
+                # Most searches use the default range, so start it while the
+                # user is reading the date prompt (once per set of collections)
+                if prefetch is None or short_names != prefetch_names:
+                    cancel_prefetch()
+                    prefetch_stop = threading.Event()
+                    prefetch = prefetch_executor.submit(prefetch_default_granules, short_names,
+                                                        args.refresh, prefetch_stop)
+                    prefetch_names = short_names
+                
+                # Get date range (No validation loop here, simple input for now)
+                print("\nEnter date range (leave blank for last 7 days):")
+                start_input = input("Start date (YYYY-MM-DD): ").strip()
+                end_input = input("End date (YYYY-MM-DD): ").strip()
+                
+                start_date = None
+                end_date = None
+                
+                if start_input:
+                    try:
+                        start_date = datetime.strptime(start_input, '%Y-%m-%d')
+                    except ValueError:
+                        print("Invalid date format. Using default range.")
+                if end_input:
+                    try:
+                        end_date = datetime.strptime(end_input, '%Y-%m-%d')
+                    except ValueError:
+                        print("Invalid date format. Using default range.")
+
+                # With the default range, wait for the prefetch and read its
+                # freshly cached results instead of querying CMR a second time;
+                # with a custom range it is of no use, so drop it
+                refresh = args.refresh
+                if start_date is None and end_date is None:
+                    if prefetch.result():
+                        refresh = False
+                else:
+                    cancel_prefetch()
+                    prefetch = prefetch_names = None
+                
+                # Search for granules
+                if len(short_names) == 1:
+                    granules = search_granules(short_names[0], start_date, end_date, refresh=refresh)
+                else:
+                    results = search_granules_bulk(short_names, start_date, end_date, refresh=refresh)
+                    granules = list(chain.from_iterable(results.values()))
+                
+                if not granules:
+                    print("\n" + "="*80)
+                    print("⚠️ No granules found for the selected collection and date range.")
+                    print("Returning to collection selection to try a different collection or date range.")
+                    print("="*80)
+                    continue # Loop continues
+                
+                # Granules found, break the loop
+                break 
+                
+            except Exception as e:
+                print(f"An unexpected error occurred: {e}. Returning to collection selection.")
+                continue
+                
+    finally:
+        # Never leave exit waiting on more than the query already in flight
+        cancel_prefetch()
+        prefetch_executor.shutdown(wait=False, cancel_futures=True)
+    
     # Check if the loop was broken by the user quitting
     if choice == 'q' or not granules:
         print("\nSearch operation ended.")
@@ -658,8 +1297,7 @@ def main():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         output_file = os.path.join(RESULTS_DIR, f"aerosol_granules_{timestamp}.json")
         
-        with open(output_file, 'w') as f:
-            json.dump(granules, f, indent=2)
+        write_json_array(output_file, granules)
         print(f"\n✓ Full results saved to: **{output_file}**")
     
     # Download option
@@ -709,7 +1347,8 @@ def main():
                 
                 print(f"\nDownloads will be saved to: **{downloads_target_dir}**")
 
-                valid_files = download_granules(selected_granules_ids, downloads_target_dir)
+                threads = get_download_threads()
+                valid_files = download_granules(selected_granules_ids, downloads_target_dir, threads=threads)
                 
                 if valid_files:
                     print(f"\n✓ Successfully downloaded {len(valid_files)} valid file(s)!")
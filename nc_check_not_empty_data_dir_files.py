@@ -1,6 +1,10 @@
 import xarray as xr
+import json
 import os
+import sys
 import numpy as np 
+from concurrent.futures import ProcessPoolExecutor
+from nc_files import iter_nc_files
 
 # --- CONSTANTS FOR SEATTLE METRO CHECK ---
 # The tight BBox for Seattle Metro Area
@@ -10,6 +14,10 @@ SEATTLE_BBOX = {
     'east': -122.2,
     'north': 47.7
 }
+# The same bounds as plain floats, looked up once for the per-file checks
+BBOX_SOUTH, BBOX_NORTH, BBOX_WEST, BBOX_EAST = (
+    float(SEATTLE_BBOX[side]) for side in ('south', 'north', 'west', 'east')
+)
 
 # Updated list with VIIRS variable names
 AOD_VARIABLE_CANDIDATES = [
@@ -31,93 +39,241 @@ AOD_VARIABLE_CANDIDATES = [
     'Deep_Blue_Aerosol_Optical_Depth_550_Land_Mean',
     'Dark_Target_Aerosol_Optical_Depth_550_Ocean_Mean',
 ]
+
+# Latitude/longitude variable names, in priority order
+LAT_CANDIDATES = ('lat', 'latitude', 'Latitude', 'LAT')
+LON_CANDIDATES = ('lon', 'longitude', 'Longitude', 'LON')
+
+# CF/ACDD global attributes giving a file's extent, in bbox_overlaps() order
+GEOSPATIAL_EXTENT_ATTRS = ('geospatial_lat_min', 'geospatial_lat_max',
+                           'geospatial_lon_min', 'geospatial_lon_max')
+
+# Per-directory cache of file header metadata (AOD variable, coordinate names,
+# grid extent), so repeat scans can skip files that cannot cover Seattle
+SCAN_CACHE_FILE = '.nc_scan_cache.json'
 # --- END CONSTANTS ---
 
 
-def check_file_for_data(file_path):
+def bbox_index_slice(coord_values, low, high):
     """
-    Opens a NetCDF file, dynamically finds the AOD variable, filters it to 
-    the tight Seattle BBox, and checks if it contains any non-NaN data points.
+    Returns the index slice of a sorted 1-D coordinate array (ascending or
+    descending) whose values fall within [low, high].
+    """
+    if coord_values[0] <= coord_values[-1]:
+        start = np.searchsorted(coord_values, low, side='left')
+        stop = np.searchsorted(coord_values, high, side='right')
+        return slice(int(start), int(stop))
+    
+    # Descending (e.g. L3 grids stored north to south): search the reversed
+    # view and map the positions back
+    reversed_values = coord_values[::-1]
+    start = np.searchsorted(reversed_values, low, side='left')
+    stop = np.searchsorted(reversed_values, high, side='right')
+    return slice(int(len(coord_values) - stop), int(len(coord_values) - start))
+
+def open_raw_dataset(file_path):
+    """
+    Opens a NetCDF file without CF decoding: values stay in their stored dtype
+    (e.g. packed int16) and fill values are left in place, which is all a
+    non-empty check needs. The default netCDF4 engine reads both NetCDF4 and
+    NetCDF3 files, and opened faster here than h5netcdf.
+    """
+    return xr.open_dataset(file_path, decode_cf=False, decode_coords=False,
+                           mask_and_scale=False, decode_times=False)
+
+def count_valid_points(data_array):
+    """Counts values that are neither NaN nor the variable's _FillValue/missing_value."""
+    values = data_array.values
+    fill_values = [data_array.attrs[fill_attr] for fill_attr in ('_FillValue', 'missing_value')
+                   if fill_attr in data_array.attrs]
+    
+    if np.issubdtype(values.dtype, np.floating):
+        valid = ~np.isnan(values)
+    else:
+        valid = np.ones(values.shape, dtype=bool)
+    
+    for fill in fill_values:
+        valid &= ~np.isin(values, fill)
+    
+    return int(np.count_nonzero(valid))
+
+def bbox_overlaps(lat_min, lat_max, lon_min, lon_max):
+    """True if the given extent intersects SEATTLE_BBOX."""
+    return not (lat_max < BBOX_SOUTH or lat_min > BBOX_NORTH or
+                lon_max < BBOX_WEST or lon_min > BBOX_EAST)
+
+def extent_from_attrs(attrs):
+    """Returns [lat_min, lat_max, lon_min, lon_max] from geospatial_* attributes, or None."""
+    try:
+        return [float(attrs[name]) for name in GEOSPATIAL_EXTENT_ATTRS]
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def load_scan_cache(cache_file):
+    """Returns the cached header metadata for a directory, or {} if there is none."""
+    try:
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_scan_cache(cache_file, cache):
+    """Writes the header metadata cache; a failure only costs the next scan time."""
+    try:
+        with open(cache_file, 'w') as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"   Warning: Could not write scan cache {cache_file}: {e}")
+
+def _check_file_for_data(file_path):
+    """
+    Opens a NetCDF file, dynamically finds the AOD variables, filters them to 
+    the tight Seattle BBox, and checks if any contains non-NaN data points.
+    When a file has several candidates (e.g. VIIRS COMBINE/DT/DB), all are
+    counted and the one with the most valid points is reported.
+    
+    Nothing is printed here, so the check can run in a worker process.
+    
+    Returns:
+        tuple: (has_data, report_lines, header) where report_lines are printed
+        by the caller and header is the file's metadata for the scan cache
+        (None if the file could not be read).
     """
     file_name = os.path.basename(file_path)
+    lines = []
+    aod_variable = None
+    header = None
     
     try:
-        # We use decode_times=False to handle potential time dimension errors gracefully
-        with xr.open_dataset(file_path, decode_times=False) as ds:
+        # Raw (undecoded) open: decoding times/CF attributes is wasted work here
+        # and decode_times=False also sidesteps time dimension errors
+        with open_raw_dataset(file_path) as ds:
             
-            # 1. Dynamically find the required AOD variable
-            aod_variable = None
-            for candidate in AOD_VARIABLE_CANDIDATES:
-                if candidate in ds.data_vars:
-                    aod_variable = candidate
-                    break
+            # 1. Dynamically find the AOD variables present, in candidate order
+            aod_variables = [name for name in AOD_VARIABLE_CANDIDATES if name in ds.data_vars]
+            aod_variable = aod_variables[0] if aod_variables else None
+            
+            header = {'aod_variable': aod_variable, 'extent': extent_from_attrs(ds.attrs)}
             
             if not aod_variable:
-                print(f"   - FAIL: Missing required AOD variable. Checked for: {AOD_VARIABLE_CANDIDATES}")
-                return False
+                lines.append(f"   - FAIL: Missing required AOD variable. Checked for: {AOD_VARIABLE_CANDIDATES}")
+                return False, lines, header
+            
+            # Most L3 products declare their extent in global attributes; if it
+            # misses the BBox, stop before reading any coordinate or AOD data
+            if header['extent'] and not bbox_overlaps(*header['extent']):
+                lines.append("   - FAIL: File extent (geospatial_* attributes) does not overlap the Seattle BBox.")
+                return False, lines, header
 
-            # 2. Identify coordinate names (handle both lowercase and uppercase)
-            lat_coord = None
-            lon_coord = None
+            # 2. Identify coordinate names (handle both lowercase and uppercase).
+            # Look in all variables: without coordinate decoding, 2-D lat/lon
+            # arrays are plain data variables rather than coords.
+            lat_coord = next((name for name in LAT_CANDIDATES if name in ds.variables), None)
+            lon_coord = next((name for name in LON_CANDIDATES if name in ds.variables), None)
             
-            # Check for latitude coordinate
-            for lat_name in ['lat', 'latitude', 'Latitude', 'LAT']:
-                if lat_name in ds.coords:
-                    lat_coord = lat_name
-                    break
+            if not lat_coord or not lon_coord:
+                lines.append(f"   - FAIL: Could not find latitude/longitude coordinates")
+                lines.append(f"      Available variables: {list(ds.variables)}")
+                return False, lines, header
+
+            # 3. Confirm the coordinates reach the BBox before touching the AOD
+            # variable: coordinates are small, while the AOD grid is the big
+            # (usually compressed) read
+            lat = ds[lat_coord]
+            lon = ds[lon_coord]
+            lat_values = lat.values
+            lon_values = lon.values
+            if lat.ndim == 1 and lon.ndim == 1:
+                # Sorted 1-D coordinates: the extent is just the end points
+                header['extent'] = [
+                    float(min(lat_values[0], lat_values[-1])), float(max(lat_values[0], lat_values[-1])),
+                    float(min(lon_values[0], lon_values[-1])), float(max(lon_values[0], lon_values[-1]))
+                ]
+            else:
+                header['extent'] = [float(np.nanmin(lat_values)), float(np.nanmax(lat_values)),
+                                    float(np.nanmin(lon_values)), float(np.nanmax(lon_values))]
             
-            # Check for longitude coordinate
-            for lon_name in ['lon', 'longitude', 'Longitude', 'LON']:
-                if lon_name in ds.coords:
-                    lon_coord = lon_name
-                    break
+            if not bbox_overlaps(*header['extent']):
+                lines.append("   - FAIL: Latitude/longitude coordinates do not reach the Seattle BBox.")
+                return False, lines, header
             
-            if not lat_coord or not lon_coord:
-                print(f"   - FAIL: Could not find latitude/longitude coordinates")
-                print(f"      Available coords: {list(ds.coords.keys())}")
-                return False
-
-            # 3. Spatially filter data to the tight Seattle BBox
-            # Use .where() with method='nearest' if grid is not perfectly aligned, 
-            # but .where() is safer for filtering L3 global grids.
-            ds_filtered = ds.where(
-                (ds[lat_coord] >= SEATTLE_BBOX['south']) & (ds[lat_coord] <= SEATTLE_BBOX['north']) &
-                (ds[lon_coord] >= SEATTLE_BBOX['west']) & (ds[lon_coord] <= SEATTLE_BBOX['east']),
-                drop=True
-            )
-
-            # 4. Check for the existence of the AOD data variable after filtering
-            if aod_variable not in ds_filtered.data_vars or ds_filtered[aod_variable].size == 0:
-                print(f"   - FAIL: AOD variable {aod_variable} was dropped after BBox filter (no data in BBox).")
-                return False
-
-            aod_data = ds_filtered[aod_variable]
+            # 4. Spatially filter data to the tight Seattle BBox
+            if lat.ndim == 1 and lon.ndim == 1:
+                # L3 grids have sorted 1-D coordinates, so locate the BBox with a
+                # binary search and read only that window of the AOD variables
+                # instead of masking (and loading) the whole global grid.
+                bbox_selection = {
+                    lat.dims[0]: bbox_index_slice(lat_values, BBOX_SOUTH, BBOX_NORTH),
+                    lon.dims[0]: bbox_index_slice(lon_values, BBOX_WEST, BBOX_EAST)
+                }
+                aod_subsets = {name: ds[name].isel(bbox_selection) for name in aod_variables}
+            else:
+                # 2-D (swath) coordinates: build the BBox mask once from the
+                # coordinate arrays already in memory, then read only the
+                # rows/columns window that holds it and mask within that.
+                # (where(drop=True) would read each whole AOD grid first.)
+                in_bbox = ((lat_values >= BBOX_SOUTH) & (lat_values <= BBOX_NORTH) &
+                           (lon_values >= BBOX_WEST) & (lon_values <= BBOX_EAST))
+                rows = np.flatnonzero(in_bbox.any(axis=1))
+                cols = np.flatnonzero(in_bbox.any(axis=0))
+                if rows.size == 0:
+                    lines.append(f"   - FAIL: AOD variable {aod_variable} was dropped after BBox filter (no data in BBox).")
+                    return False, lines, header
+                
+                window = {lat.dims[0]: slice(int(rows[0]), int(rows[-1]) + 1),
+                          lat.dims[1]: slice(int(cols[0]), int(cols[-1]) + 1)}
+                window_mask = xr.DataArray(in_bbox, dims=lat.dims).isel(window)
+                aod_subsets = {name: ds[name].isel(window).where(window_mask) for name in aod_variables}
+
+            # 5. Check for the existence of the AOD data after filtering
+            if aod_subsets[aod_variable].size == 0:
+                lines.append(f"   - FAIL: AOD variable {aod_variable} was dropped after BBox filter (no data in BBox).")
+                return False, lines, header
             
-            # 5. Use robust counting (xarray's .count() ignores NaNs)
-            valid_count = aod_data.count().item()
+            # 6. Count points that are not NaN or fill values (the data is not
+            # mask-decoded, so fill values are still in the array). max() keeps
+            # the earlier candidate on ties, so priority order still decides.
+            valid_counts = {name: count_valid_points(data) for name, data in aod_subsets.items()}
+            aod_variable = max(valid_counts, key=valid_counts.get)
+            valid_count = valid_counts[aod_variable]
             
             if valid_count > 0:
-                print(f"   - SUCCESS: Found {valid_count} non-NaN AOD points in Seattle BBox (Variable: {aod_variable}).")
-                return True
+                lines.append(f"   - SUCCESS: Found {valid_count} non-NaN AOD points in Seattle BBox (Variable: {aod_variable}).")
+                if len(valid_counts) > 1:
+                    lines.append("      Valid points per variable: " +
+                                 ", ".join(f"{name}={count}" for name, count in valid_counts.items()))
+                return True, lines, header
             else:
-                print("   - FAIL: BBox filtered but all data points were NaN (likely cloud/quality masked).")
-                return False
+                lines.append("   - FAIL: BBox filtered but all data points were NaN (likely cloud/quality masked).")
+                return False, lines, header
 
     except FileNotFoundError:
-        print(f"   Error: File not found at {file_path}")
-        return False
+        lines.append(f"   Error: File not found at {file_path}")
+        return False, lines, header
     except ValueError as e:
         # This catches the 'zero-size array to reduction operation maximum' error robustly
         if "zero-size array to reduction operation" in str(e):
-             print(f"   Warning: BBox filter resulted in zero valid data points for {aod_variable}. This is usually not a code error, but a lack of non-NaN data in the area.")
-             return False
+             lines.append(f"   Warning: BBox filter resulted in zero valid data points for {aod_variable}. This is usually not a code error, but a lack of non-NaN data in the area.")
+             return False, lines, header
         # Catch other ValueErrors
-        print(f"   Warning: Error reading {file_name}: {e}")
-        return False
+        lines.append(f"   Warning: Error reading {file_name}: {e}")
+        return False, lines, header
     except Exception as e:
         # Catch errors like file corruption or unsupported format
-        print(f"   Warning: Error reading {file_name}: {e}")
-        return False
+        lines.append(f"   Warning: Error reading {file_name}: {e}")
+        return False, lines, header
+
+def check_file_for_data(file_path):
+    """
+    Checks one file for valid AOD data in the Seattle BBox, printing the result.
+    
+    Returns:
+        bool: True if the file has at least one valid AOD point in the BBox.
+    """
+    has_data, lines, _ = _check_file_for_data(file_path)
+    if lines:
+        print("\n".join(lines))
+    return has_data
 
 def find_valid_seattle_files(directory="./data/results_downloads"):
     """
@@ -134,18 +290,68 @@ def find_valid_seattle_files(directory="./data/results_downloads"):
         print(f"Directory not found: {target_dir}. Please create it or check the path.")
         return
 
+    file_paths = list(iter_nc_files(target_dir))
+    
+    # Files unchanged since the last scan whose grid does not reach the BBox
+    # are answered from the cache without opening them
+    cache_file = os.path.join(target_dir, SCAN_CACHE_FILE)
+    cache = load_scan_cache(cache_file)
+    new_cache = {}
+    results = {}
+    to_check = []
+    
+    for file_path in file_paths:
+        key = os.path.relpath(file_path, start=target_dir)
+        stat = os.stat(file_path)
+        entry = cache.get(key)
+        if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            new_cache[key] = entry
+            if not entry['aod_variable']:
+                results[file_path] = (False, ["   - SKIP: No AOD variable in this file (cached)."])
+                continue
+            if entry['extent'] and not bbox_overlaps(*entry['extent']):
+                results[file_path] = (False, ["   - SKIP: File extent does not overlap the Seattle BBox (cached)."])
+                continue
+        to_check.append((file_path, key, stat))
+    
+    # Each file is independent and HDF5 decompression holds the GIL, so check
+    # files in separate processes. Workers return their report lines, which
+    # are printed here in file order.
+    check_paths = [file_path for file_path, _, _ in to_check]
+    if len(check_paths) > 1:
+        workers = min(os.cpu_count() or 1, len(check_paths))
+        chunksize = max(1, len(check_paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            checked = list(executor.map(_check_file_for_data, check_paths, chunksize=chunksize))
+    else:
+        checked = [_check_file_for_data(file_path) for file_path in check_paths]
+    
+    for (file_path, key, stat), (has_data, lines, header) in zip(to_check, checked):
+        results[file_path] = (has_data, lines)
+        if header:
+            new_cache[key] = dict(header, mtime=stat.st_mtime, size=stat.st_size)
+        else:
+            new_cache.pop(key, None)
+    
+    if new_cache != cache:
+        save_scan_cache(cache_file, new_cache)
+    
     valid_files = []
+    report = []
     
-    for root, _, files in os.walk(target_dir):
-        for file_name in files:
-            if file_name.endswith(('.nc', '.nc4')):
-                file_path = os.path.join(root, file_name)
-                
-                # Print which file is currently being checked
-                print(f"\nChecking file: {os.path.relpath(file_path, start=target_dir).replace(os.sep, '/')}")
-                
-                if check_file_for_data(file_path):
-                    valid_files.append(file_path)
+    for file_path in file_paths:
+        has_data, lines = results[file_path]
+        # Which file was checked, followed by its result
+        report.append(f"\nChecking file: {os.path.relpath(file_path, start=target_dir).replace(os.sep, '/')}")
+        report.extend(lines)
+        
+        if has_data:
+            valid_files.append(file_path)
+    
+    # One write for the whole per-file report instead of two (flushed) prints
+    # per file, which dominate once most files are rejected from the cache
+    if report:
+        sys.stdout.write("\n".join(report) + "\n")
 
     # Post-scan summary
     print("\n" + "=" * 60)
@@ -154,10 +360,8 @@ def find_valid_seattle_files(directory="./data/results_downloads"):
     
     if valid_files:
         print("List of Valid Data Files (Clear Day Over Seattle):")
-        for f in valid_files:
-            # Display relative path
-            display_path = os.path.relpath(f, start=target_dir).replace(os.sep, '/')
-            print(f"- {display_path}")
+        # Display relative paths
+        print("\n".join(f"- {os.path.relpath(f, start=target_dir).replace(os.sep, '/')}" for f in valid_files))
     else:
         print("No NetCDF files were found with valid, non-cloud-masked AOD data for the tight Seattle Metro BBox.")
 
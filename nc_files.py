@@ -0,0 +1,13 @@
+import os
+
+
+def iter_nc_files(directory):
+    """Yields the paths of all .nc/.nc4 files under directory, recursively."""
+    # scandir reports each entry's type from the directory listing itself,
+    # so unlike os.walk no extra stat is needed per entry
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_nc_files(entry.path)
+            elif entry.name.endswith(('.nc', '.nc4')) and entry.is_file():
+                yield entry.path
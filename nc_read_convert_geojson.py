@@ -1,8 +1,41 @@
+import argparse
+import contextlib
+import io
 import xarray as xr
-import pandas as pd
 import json 
+import math
+import numpy as np
 import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from nc_files import iter_nc_files
+
+# --- PYARROW IMPORT FOR FAST CSV/PARQUET EXPORT ---
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    from pyarrow import parquet as pa_parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+# ---------------------------------------------------
+
+# --- ORJSON IMPORT FOR FAST GEOJSON WRITING ---
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+# ----------------------------------------------
+
+# --- NUMBA IMPORT FOR FAST VALID-VALUE COUNTS ---
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+# ------------------------------------------------
 
 # --- GEOJSON CONFIGURATION ---
 OUTPUT_DIR = 'data/geojson' 
@@ -31,45 +64,75 @@ AOD_VARIABLE_CANDIDATES = [
     'Aerosol_Optical_Depth_550nm_Mean',
     'AOD_550nm',
 ]
+
+# Latitude/longitude coordinate names, in priority order
+LAT_CANDIDATES = ('lat', 'latitude', 'Latitude', 'LAT')
+LON_CANDIDATES = ('lon', 'longitude', 'Longitude', 'LON')
+
+# Decimal places written to GeoJSON: 6 for lat/lon (~0.1 m, beyond what any
+# web map uses) and 4 for AOD (well below its retrieval uncertainty)
+COORDINATE_DECIMALS = 6
+AOD_DECIMALS = 4
 # --- END GEOJSON CONFIGURATION ---
 
 MAX_ATTR_LENGTH = 120
 
-def generate_output_filename(nc_filepath, satellite_type=""):
-    """Creates a descriptive filename for the GeoJSON from the NetCDF name."""
-    base_name = os.path.basename(nc_filepath)
+# Dates in granule file names: PACE_OCI.20250702.L3m... and
+# AER_DBDT_D10KM_L3_VIIRS_NOAA20.2025152... (year + day of year)
+PACE_DATE_RE = re.compile(r'PACE_OCI\.([^.]*)')
+VIIRS_DATE_RE = re.compile(r'(?:^|\.)(\d{7})(?=\.|$)')
+
+# Global attributes marked with ** in the attribute listing
+HIGHLIGHTED_ATTRS = frozenset({
+    'product_name', 'time_coverage_start', 'time_coverage_end',
+    'geospatial_lat_max', 'geospatial_lat_min', 'geospatial_lon_max', 'geospatial_lon_min',
+    'processing_version', 'day_night_flag'
+})
+
+# Approximate rows converted and written per block when streaming whole-dataset
+# CSV/Parquet exports (one Parquet row group each)
+EXPORT_ROWS_PER_BLOCK = 1_000_000
+
+# User BBox windows larger than this many values have their valid values
+# counted with the numba kernel when available
+NUMBA_COUNT_THRESHOLD = 1_000_000
+
+# BBox export DataFrames kept per interactive session, so exporting the same
+# area again skips the grid-to-table conversion
+FRAME_CACHE_SIZE = 2
+
+def generate_output_filename(nc_filepath, satellite_type="", base_name=None):
+    """
+    Creates a descriptive filename for the GeoJSON from the NetCDF name.
+    base_name may be passed when the caller already has the file's basename.
+    """
+    if base_name is None:
+        base_name = os.path.basename(nc_filepath)
     
     # Try to extract date
     date_str = "undated"
     
     # PACE format: PACE_OCI.20250702.L3m...
-    if 'PACE_OCI.' in base_name:
-        try:
-            date_str = base_name.split('PACE_OCI.')[1].split('.')[0]
-            satellite_type = "PACE"
-        except IndexError:
-            pass
+    pace_match = PACE_DATE_RE.search(base_name)
+    if pace_match:
+        date_str = pace_match.group(1)
+        satellite_type = "PACE"
     
     # VIIRS format: AER_DBDT_D10KM_L3_VIIRS_NOAA20.2025152...
     elif 'VIIRS' in base_name:
-        try:
-            # Extract Julian date (e.g., 2025152)
-            parts = base_name.split('.')
-            for part in parts:
-                if part.startswith('2025') and len(part) == 7:
-                    date_str = part
-                    break
-            
-            if 'NOAA20' in base_name:
-                satellite_type = "NOAA20"
-            elif 'NOAA21' in base_name or 'JPSS2' in base_name:
-                satellite_type = "NOAA21"
-            elif 'NPP' in base_name:
-                satellite_type = "NPP"
-            else:
-                satellite_type = "VIIRS"
-        except:
-            pass
+        # Extract Julian date (e.g., 2025152)
+        viirs_match = VIIRS_DATE_RE.search(base_name)
+        if viirs_match:
+            date_str = viirs_match.group(1)
+        
+        if 'NOAA20' in base_name:
+            satellite_type = "NOAA20"
+        elif 'NOAA21' in base_name or 'JPSS2' in base_name:
+            satellite_type = "NOAA21"
+        elif 'NPP' in base_name:
+            satellite_type = "NPP"
+        else:
+            satellite_type = "VIIRS"
     
     # Extract resolution if available
     resolution_str = ""
@@ -93,11 +156,9 @@ def get_file():
     
     return file_path
 
-def display_global_attributes(ds):
-    """Displays all global attributes, truncating long values for readability."""
-    print("\n" + "="*60)
-    print("GLOBAL ATTRIBUTES (Metadata):")
-    print("="*60)
+def global_attribute_lines(ds):
+    """Returns the lines listing all global attributes, long values truncated."""
+    lines = ["\n" + "="*60, "GLOBAL ATTRIBUTES (Metadata):", "="*60]
     
     sorted_attrs = sorted(ds.attrs.items())
     
@@ -106,10 +167,17 @@ def display_global_attributes(ds):
         if len(display_value) > MAX_ATTR_LENGTH:
             display_value = display_value[:MAX_ATTR_LENGTH] + "..."
         
-        if key in ['product_name', 'time_coverage_start', 'time_coverage_end', 'geospatial_lat_max', 'geospatial_lat_min', 'geospatial_lon_max', 'geospatial_lon_min', 'processing_version', 'day_night_flag']:
-            print(f"** {key}: {display_value}")
+        if key in HIGHLIGHTED_ATTRS:
+            lines.append(f"** {key}: {display_value}")
         else:
-            print(f"   - {key}: {display_value}")
+            lines.append(f"   - {key}: {display_value}")
+    
+    return lines
+
+def display_global_attributes(ds):
+    """Displays all global attributes, truncating long values for readability."""
+    # One write for the whole listing instead of a print per attribute
+    sys.stdout.write("\n".join(global_attribute_lines(ds)) + "\n")
 
 def pre_check_dataset(ds):
     """Validates file content, counts dimensions/variables, and checks for emptiness."""
@@ -118,7 +186,7 @@ def pre_check_dataset(ds):
     total_dimensions = len(ds.dims)
     
     if total_data_variables > 0:
-        first_var_name = list(ds.data_vars)[0]
+        first_var_name = next(iter(ds.data_vars))
         total_points = ds[first_var_name].size
     else:
         total_points = 0
@@ -141,59 +209,75 @@ def pre_check_dataset(ds):
 
 def display_info(ds):
     """Displays dataset info, variables, coordinates, and ALL global attributes."""
-    print("\n" + "="*60)
-    print("DATASET OVERVIEW")
-    print("="*60)
-    print(ds)
-    
-    display_global_attributes(ds)
-    
-    print("\n" + "="*60)
-    print("VARIABLES AVAILABLE:")
-    print("="*60)
-    for var in ds.data_vars:
-        print(f"\n- {var}")
-        print(f"  Shape: {ds[var].shape}")
-        print(f"  Dimensions: {ds[var].dims}")
-        if 'long_name' in ds[var].attrs:
-            print(f"  Description: {ds[var].attrs['long_name']}")
-        if 'units' in ds[var].attrs:
-            print(f"  Units: {ds[var].attrs['units']}")
-    
-    print("\n" + "="*60)
-    print("COORDINATES:")
-    print("="*60)
-    for coord in ds.coords:
-        print(f"- {coord}: {ds[coord].shape}")
+    # The report is built as a list of lines and written once at the end
+    lines = ["\n" + "="*60, "DATASET OVERVIEW", "="*60, str(ds)]
+    
+    lines.extend(global_attribute_lines(ds))
+    
+    lines.extend(["\n" + "="*60, "VARIABLES AVAILABLE:", "="*60])
+    for var, var_data in ds.data_vars.items():
+        lines.append(f"\n- {var}")
+        lines.append(f"  Shape: {var_data.shape}")
+        lines.append(f"  Dimensions: {var_data.dims}")
+        if 'long_name' in var_data.attrs:
+            lines.append(f"  Description: {var_data.attrs['long_name']}")
+        if 'units' in var_data.attrs:
+            lines.append(f"  Units: {var_data.attrs['units']}")
+    
+    lines.extend(["\n" + "="*60, "COORDINATES:", "="*60])
+    for coord, coord_data in ds.coords.items():
+        lines.append(f"- {coord}: {coord_data.shape}")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def find_aod_variable(ds):
     """Dynamically find the AOD variable in the dataset."""
-    for candidate in AOD_VARIABLE_CANDIDATES:
-        if candidate in ds.data_vars:
-            return candidate
-    return None
+    return next((candidate for candidate in AOD_VARIABLE_CANDIDATES if candidate in ds.data_vars), None)
 
 def find_coordinates(ds):
     """Find latitude and longitude coordinates (handles different naming)."""
-    lat_coord = None
-    lon_coord = None
-    
-    for lat_name in ['lat', 'latitude', 'Latitude', 'LAT']:
-        if lat_name in ds.coords:
-            lat_coord = lat_name
-            break
-    
-    for lon_name in ['lon', 'longitude', 'Longitude', 'LON']:
-        if lon_name in ds.coords:
-            lon_coord = lon_name
-            break
-    
+    lat_coord = next((name for name in LAT_CANDIDATES if name in ds.coords), None)
+    lon_coord = next((name for name in LON_CANDIDATES if name in ds.coords), None)
     return lat_coord, lon_coord
 
-def export_to_geojson(ds, nc_filepath):
+def ordered_slice(coord, low, high):
+    """
+    Label slice covering [low, high] on a 1-D coordinate: slice(low, high)
+    when it is ascending, slice(high, low) when it is descending (many L3
+    grids store latitude north to south).
+    """
+    values = coord.values
+    return slice(low, high) if values[0] <= values[-1] else slice(high, low)
+
+def _dump_json(obj):
+    """Encodes obj as compact UTF-8 JSON bytes, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+def write_feature_collection(output_file, metadata, features):
     """
-    Spatially filters the dataset to SEATTLE_BBOX and exports to GeoJSON.
-    Works with both PACE and VIIRS data.
+    Writes a GeoJSON FeatureCollection with one compact feature per line.
+    Features are encoded one at a time and written straight to the file,
+    instead of pretty-printing the whole document with json.dump(indent=2).
+    """
+    with open(output_file, 'wb') as f:
+        f.write(b'{"type":"FeatureCollection","metadata":')
+        f.write(_dump_json(metadata))
+        f.write(b',"features":[\n')
+        for i, feature in enumerate(features):
+            if i:
+                f.write(b',\n')
+            f.write(_dump_json(feature))
+        f.write(b'\n]}\n')
+
+def export_to_geojson(ds, nc_filepath, output_dir=None):
+    """
+    Spatially filters the dataset to SEATTLE_BBOX and exports to GeoJSON in
+    output_dir (OUTPUT_DIR by default). Works with both PACE and VIIRS data.
+    
+    Returns:
+        str: The path of the written GeoJSON file, or None if nothing was exported.
     """
     print("\nStarting GeoJSON export (Filtered by Seattle BBox)...")
     
@@ -216,11 +300,17 @@ def export_to_geojson(ds, nc_filepath):
     
     print(f"Using coordinates: {lat_coord}, {lon_coord}")
     
+    # Only the AOD variable is filtered; the other data variables are never read
+    aod = ds[aod_variable]
+    
+    # Global and variable attributes are fetched once and read as plain dicts
+    attrs = ds.attrs
+    base_name = os.path.basename(nc_filepath)
     metadata = {
-        "source_product": ds.attrs.get('product_name', os.path.basename(nc_filepath)),
-        "time_start": ds.attrs.get('time_coverage_start', ds.attrs.get('RangeBeginningDate', 'N/A')),
-        "time_end": ds.attrs.get('time_coverage_end', ds.attrs.get('RangeEndingDate', 'N/A')),
-        "variable_description": ds[aod_variable].attrs.get('long_name', 'Aerosol Optical Depth'),
+        "source_product": attrs.get('product_name', base_name),
+        "time_start": attrs.get('time_coverage_start', attrs.get('RangeBeginningDate', 'N/A')),
+        "time_end": attrs.get('time_coverage_end', attrs.get('RangeEndingDate', 'N/A')),
+        "variable_description": aod.attrs.get('long_name', 'Aerosol Optical Depth'),
         "variable_name": aod_variable
     }
     
@@ -228,107 +318,388 @@ def export_to_geojson(ds, nc_filepath):
     print(f"Filtering data to BBox: {SEATTLE_BBOX}...")
     
     try:
-        ds_filtered = ds.where(
-            (ds[lat_coord] >= SEATTLE_BBOX['south']) & (ds[lat_coord] <= SEATTLE_BBOX['north']) &
-            (ds[lon_coord] >= SEATTLE_BBOX['west']) & (ds[lon_coord] <= SEATTLE_BBOX['east']),
-            drop=True
-        )
+        if lat_coord in ds.indexes and lon_coord in ds.indexes:
+            # 1-D indexed grid: label slicing is a binary search on the index
+            # and never builds a mask over the whole grid
+            aod_filtered = aod.sel({
+                lat_coord: ordered_slice(ds[lat_coord], SEATTLE_BBOX['south'], SEATTLE_BBOX['north']),
+                lon_coord: ordered_slice(ds[lon_coord], SEATTLE_BBOX['west'], SEATTLE_BBOX['east'])
+            })
+        else:
+            # 2-D (swath) coordinates: build the mask from the coordinate
+            # arrays, then read and mask only the rows/columns window around
+            # it instead of where(drop=True) masking a copy of the whole grid
+            lat_values = ds[lat_coord].values
+            lon_values = ds[lon_coord].values
+            in_bbox = ((lat_values >= SEATTLE_BBOX['south']) & (lat_values <= SEATTLE_BBOX['north']) &
+                       (lon_values >= SEATTLE_BBOX['west']) & (lon_values <= SEATTLE_BBOX['east']))
+            rows = np.flatnonzero(in_bbox.any(axis=1))
+            cols = np.flatnonzero(in_bbox.any(axis=0))
+            if rows.size == 0:
+                print("Warning: Filtered dataset has no data points in Seattle BBox.")
+                return
+            
+            swath_dims = ds[lat_coord].dims
+            window = {swath_dims[0]: slice(int(rows[0]), int(rows[-1]) + 1),
+                      swath_dims[1]: slice(int(cols[0]), int(cols[-1]) + 1)}
+            aod_filtered = aod.isel(window).where(xr.DataArray(in_bbox, dims=swath_dims).isel(window))
     except Exception as e:
         print(f"Error during spatial filtering: {e}")
         return
     
-    if aod_variable not in ds_filtered.data_vars or ds_filtered[aod_variable].size == 0:
+    if aod_filtered.size == 0:
         print("Warning: Filtered dataset has no data points in Seattle BBox.")
         return
 
-    # Convert to DataFrame
-    print("Converting filtered data to DataFrame...")
-    df = ds_filtered[aod_variable].to_dataframe().dropna()
-    df = df.rename(columns={aod_variable: 'aerosol_aod_550'})
-    
-    if df.empty:
+    # Count valid points on the array first (no pandas involved), so an
+    # all-NaN BBox never pays for building the MultiIndexed DataFrame
+    if aod_filtered.count().item() == 0:
         print("Warning: Filtered dataset contains only NaN values (no valid data).")
         return
 
+    # Pull the valid points straight from the arrays: lat/lon are broadcast
+    # to the AOD grid's shape (this covers 1-D grids and 2-D swaths alike)
+    # and all three are flattened through one mask, in the same C order
+    # to_dataframe() would have produced -- no DataFrame, dropna or index
+    print("Extracting valid points...")
+    lat_grid, lon_grid = (
+        coord.transpose(*aod_filtered.dims).values
+        for coord in xr.broadcast(aod_filtered[lat_coord], aod_filtered[lon_coord], aod_filtered)[:2]
+    )
+    aod_values = aod_filtered.values.astype('float64', copy=False)
+    lat_grid = lat_grid.astype('float64', copy=False)
+    lon_grid = lon_grid.astype('float64', copy=False)
+    valid = ~(np.isnan(aod_values) | np.isnan(lat_grid) | np.isnan(lon_grid))
+    
+    # Rounded so the encoder writes short numbers instead of full float64
+    # reprs; tolist() then converts each column to Python floats in one call
+    lats = np.round(lat_grid[valid], COORDINATE_DECIMALS).tolist()
+    lons = np.round(lon_grid[valid], COORDINATE_DECIMALS).tolist()
+    aods = np.round(aod_values[valid], AOD_DECIMALS).tolist()
+
     # Build GeoJSON
-    print(f"Found {len(df)} valid data points. Generating GeoJSON...")
+    print(f"Found {len(aods)} valid data points. Generating GeoJSON...")
     
     geojson = {
         "type": "FeatureCollection",
         "metadata": metadata,
-        "features": []
-    }
-    
-    # Handle multi-index (lat, lon) or single index
-    if isinstance(df.index, pd.MultiIndex):
-        for idx, row in df.iterrows():
-            # Extract lat/lon from multi-index
-            if lat_coord in df.index.names and lon_coord in df.index.names:
-                lat = idx[df.index.names.index(lat_coord)]
-                lon = idx[df.index.names.index(lon_coord)]
-            else:
-                continue
-            
-            aerosol_value = row['aerosol_aod_550']
-            
-            feature = {
+        "features": [
+            {
                 "type": "Feature",
                 "geometry": {
                     "type": "Point",
-                    "coordinates": [float(lon), float(lat)]
+                    "coordinates": [lon, lat]
                 },
                 "properties": {
-                    "aod": float(aerosol_value),
-                    "lat": float(lat),
-                    "lon": float(lon)
+                    "aod": aod,
+                    "lat": lat,
+                    "lon": lon
                 }
             }
-            geojson['features'].append(feature)
-    else:
-        # Single index - lat/lon might be columns
-        for idx, row in df.iterrows():
-            aerosol_value = row['aerosol_aod_550']
-            lat = row.get(lat_coord, row.get('lat', None))
-            lon = row.get(lon_coord, row.get('lon', None))
-            
-            if lat is None or lon is None:
-                continue
-            
-            feature = {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [float(lon), float(lat)]
-                },
-                "properties": {
-                    "aod": float(aerosol_value),
-                    "lat": float(lat),
-                    "lon": float(lon)
-                }
-            }
-            geojson['features'].append(feature)
+            for lat, lon, aod in zip(lats, lons, aods)
+        ]
+    }
 
     # Save GeoJSON
+    output_dir = output_dir or OUTPUT_DIR
     try:
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
     except Exception as e:
-        print(f"Error creating output directory '{OUTPUT_DIR}': {e}")
+        print(f"Error creating output directory '{output_dir}': {e}")
         return
 
-    output_file_name = generate_output_filename(nc_filepath)
-    output_file_path = os.path.join(OUTPUT_DIR, output_file_name)
+    output_file_name = generate_output_filename(nc_filepath, base_name=base_name)
+    output_file_path = os.path.join(output_dir, output_file_name)
     
-    with open(output_file_path, 'w') as f:
-        json.dump(geojson, f, indent=2)
+    write_feature_collection(output_file_path, geojson['metadata'], geojson['features'])
     
     print("-------------------------------------------------------------")
     print(f"Success! GeoJSON saved to: {output_file_path}")
     print(f"   Total features exported: {len(geojson['features'])}")
     print(f"   Using AOD variable: {aod_variable}")
     print("-------------------------------------------------------------")
+    return output_file_path
 
-def save_data(ds, file_path):
-    """Presents export options and performs the chosen export operation."""
+def _export_geojson_file(file_path, output_dir=None):
+    """
+    Opens one NetCDF file and exports its Seattle GeoJSON. Runs in a worker
+    process, so the export's output is captured and returned for the parent
+    to print in file order.
+    
+    Returns:
+        tuple: (output_file_path or None, captured output text)
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            with xr.open_dataset(file_path, decode_times=False) as ds:
+                output_file_path = export_to_geojson(ds, file_path, output_dir)
+        except Exception as e:
+            print(f"\nError processing file: {e}")
+            output_file_path = None
+    return output_file_path, output.getvalue()
+
+def export_geojson_batch(directory, output_dir=None):
+    """
+    Exports the Seattle GeoJSON of every .nc/.nc4 file under directory into
+    output_dir (OUTPUT_DIR by default). Files are independent, so they are
+    processed in parallel worker processes.
+    
+    Returns:
+        int: The number of files exported.
+    """
+    file_paths = sorted(iter_nc_files(directory))
+    if not file_paths:
+        print(f"No NetCDF files found in {directory}")
+        return 0
+    
+    print(f"Exporting GeoJSON for {len(file_paths)} files in {directory}...")
+    workers = min(os.cpu_count() or 1, len(file_paths))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_export_geojson_file, file_paths, [output_dir] * len(file_paths)))
+    
+    exported = 0
+    for file_path, (output_file_path, text) in zip(file_paths, results):
+        print(f"\n=== {os.path.relpath(file_path, start=directory)} ===")
+        print(text, end='')
+        if output_file_path:
+            exported += 1
+    
+    print(f"\nBatch complete: {exported} of {len(file_paths)} files exported to {output_dir or OUTPUT_DIR}")
+    return exported
+
+def write_csv(df, output_file):
+    """
+    Writes a DataFrame to CSV without its index. PyArrow's multithreaded C++
+    writer is used when installed; it is much faster than pandas' writer on
+    the large numeric frames NetCDF grids produce.
+    """
+    if PYARROW_AVAILABLE:
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), output_file)
+    else:
+        df.to_csv(output_file, index=False)
+
+def export_frame(ds, reset_index=True):
+    """
+    Flattens a dataset into a DataFrame for export. float64 data variables are
+    downcast to float32 (AOD products are stored as scaled int16, so float64
+    adds no precision) and rows where every data variable is NaN -- ocean,
+    cloud and quality-masked pixels, usually most of an L3 grid -- are dropped.
+    With reset_index=False the dimensions stay as the (Multi)Index.
+    """
+    ds = ds.assign({
+        name: var.astype('float32') for name, var in ds.data_vars.items() if var.dtype == 'float64'
+    })
+    df = ds.to_dataframe()
+    if reset_index:
+        df = df.reset_index()
+    if ds.data_vars:
+        df = df.dropna(subset=list(ds.data_vars), how='all')
+    return df
+
+def cached_export_frame(ds, frames, key):
+    """
+    Returns export_frame(ds), reusing the DataFrame stored in frames (a dict
+    owned by the interactive session) under key if that selection was already
+    converted. The oldest entry is dropped beyond FRAME_CACHE_SIZE.
+    """
+    if frames is None:
+        return export_frame(ds)
+    if key not in frames:
+        if len(frames) >= FRAME_CACHE_SIZE:
+            frames.pop(next(iter(frames)))
+        frames[key] = export_frame(ds)
+    return frames[key]
+
+def iter_export_blocks(ds, reset_index=True):
+    """
+    Yields export_frame() of consecutive blocks of the dataset along its
+    outermost dimension, each about EXPORT_ROWS_PER_BLOCK rows, so only one
+    block's DataFrame is ever in memory instead of the full dense grid.
+    A dataset without dimensions is yielded as one frame.
+    """
+    if not ds.dims or 0 in ds.sizes.values():
+        yield export_frame(ds, reset_index)
+        return
+    
+    # to_dataframe() has one row per point of the full dimension product
+    outer_dim = next(iter(ds.dims))
+    rows_per_index = math.prod(ds.sizes.values()) // ds.sizes[outer_dim]
+    step = max(1, EXPORT_ROWS_PER_BLOCK // max(1, rows_per_index))
+    
+    for start in range(0, ds.sizes[outer_dim], step):
+        yield export_frame(ds.isel({outer_dim: slice(start, start + step)}), reset_index)
+
+def write_csv_blocks(ds, output_file):
+    """
+    Writes the dataset (see export_frame) to CSV block by block (see
+    iter_export_blocks), through PyArrow's incremental CSV writer when it
+    is installed and by appending with pandas otherwise.
+    """
+    if not PYARROW_AVAILABLE:
+        for i, df in enumerate(iter_export_blocks(ds)):
+            df.to_csv(output_file, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        return
+    
+    writer = None
+    try:
+        for df in iter_export_blocks(ds):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pa_csv.CSVWriter(output_file, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def write_parquet(ds, output_file):
+    """
+    Writes the dataset (see export_frame) to a snappy-compressed Parquet file.
+    
+    With PyArrow installed the dataset is converted and written block by
+    block (see iter_export_blocks), one row group each.
+    
+    The dimension coordinates are written straight from the DataFrame's index
+    (no reset_index copy). They are ordinary columns to Arrow, Polars and
+    DuckDB; pandas.read_parquet restores them as the index.
+    """
+    if not ds.dims:
+        export_frame(ds).to_parquet(output_file, index=False, compression='snappy')
+        return
+    if not PYARROW_AVAILABLE:
+        export_frame(ds, reset_index=False).to_parquet(output_file, compression='snappy')
+        return
+    
+    writer = None
+    try:
+        for df in iter_export_blocks(ds, reset_index=False):
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            if writer is None:
+                writer = pa_parquet.ParquetWriter(output_file, table.schema, compression='snappy')
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export_csv(ds, output_file):
+    """Exports the whole dataset (see export_frame) to CSV, streamed in blocks."""
+    print("Converting to dataframe...")
+    write_csv_blocks(ds, output_file)
+    print(f"Saved to {output_file}")
+
+def export_parquet(ds, output_file):
+    """Exports the whole dataset (see export_frame) to Parquet, streamed in blocks."""
+    print("Converting to dataframe...")
+    write_parquet(ds, output_file)
+    print(f"Saved to {output_file}")
+
+def export_variable_csv(ds, var_name, output_file):
+    """Exports a single variable to CSV."""
+    print(f"Converting {var_name} to dataframe...")
+    write_csv(ds[var_name].to_dataframe().reset_index(), output_file)
+    print(f"Saved to {output_file}")
+
+def export_info(ds, output_file):
+    """
+    Writes an ncdump-style header (dimensions, variables and every attribute,
+    untruncated) to a text file. Only metadata is read, never the data.
+    """
+    with open(output_file, 'w') as f:
+        ds.info(f)
+    print(f"Dataset info saved to {output_file}")
+
+# Source encoding carried over by export_compressed_netcdf. Chunking and
+# storage layout are left out: they describe the source file's shape, which a
+# subset no longer has.
+NETCDF_ENCODING_KEYS = frozenset({
+    'dtype', '_FillValue', 'missing_value', 'scale_factor', 'add_offset',
+    'units', 'calendar', 'least_significant_digit',
+})
+
+def export_compressed_netcdf(ds, output_file):
+    """
+    Saves a compressed NetCDF4 copy: numeric variables get shuffle + zlib
+    (level 4), which typically shrinks packed int16 AOD grids several-fold
+    and stays readable by any NetCDF4 tool.
+    """
+    # Per-variable encodings passed to to_netcdf replace the source encoding,
+    # so start from it to keep the packing (dtype, scale_factor, _FillValue)
+    encoding = {}
+    for name, var in ds.data_vars.items():
+        if var.dtype.kind not in 'iuf':
+            continue
+        var_encoding = {key: value for key, value in var.encoding.items() if key in NETCDF_ENCODING_KEYS}
+        var_encoding.update(zlib=True, complevel=4, shuffle=True)
+        encoding[name] = var_encoding
+    print("Writing compressed NetCDF...")
+    ds.to_netcdf(output_file, format='NETCDF4', engine='netcdf4', encoding=encoding)
+    print(f"Saved to {output_file}")
+
+if NUMBA_AVAILABLE:
+    # No fastmath: it lets the compiler assume there are no NaNs, which would
+    # break the x == x test
+    @njit(cache=True)
+    def _count_valid_numba(values):
+        """Counts the non-NaN entries of a 1-D array in one pass."""
+        count = 0
+        for x in values:
+            if x == x:
+                count += 1
+        return count
+
+def count_valid_values(values):
+    """
+    Counts the non-NaN values of an array. Large float32/float64/integer
+    arrays go through the numba kernel when it is available, which avoids a
+    boolean temporary the size of the array.
+    """
+    kernel_dtype = values.dtype in (np.float32, np.float64) or values.dtype.kind in 'iu'
+    if NUMBA_AVAILABLE and values.size > NUMBA_COUNT_THRESHOLD and kernel_dtype:
+        return int(_count_valid_numba(values.ravel()))
+    if values.dtype.kind != 'f':
+        return int(values.size)
+    return int(values.size - np.count_nonzero(np.isnan(values)))
+
+def export_bbox_csv(ds, lat_range, lon_range, output_file, frames=None):
+    """
+    Exports the part of the dataset inside (lat_min, lat_max) x (lon_min, lon_max) to CSV.
+    The filtered DataFrame is cached in frames (see cached_export_frame).
+    Nothing is written if no numeric data variable has a valid value in the box.
+    
+    Returns:
+        bool: False if the dataset has no recognizable lat/lon coordinates.
+    """
+    lat_coord, lon_coord = find_coordinates(ds)
+    if not lat_coord or not lon_coord:
+        print("Error: Could not find latitude/longitude coordinates")
+        return False
+    
+    print("Filtering data...")
+    filtered = ds.sel(
+        {lat_coord: ordered_slice(ds[lat_coord], *lat_range),
+         lon_coord: ordered_slice(ds[lon_coord], *lon_range)}
+    )
+    
+    # Count valid values before building the DataFrame, which for a large
+    # user BBox is the expensive step
+    valid_counts = {name: count_valid_values(var.values)
+                    for name, var in filtered.data_vars.items() if var.dtype.kind in 'iuf'}
+    if valid_counts:
+        print("Valid values in BBox: " + ", ".join(f"{name}={count}" for name, count in valid_counts.items()))
+        if not any(valid_counts.values()):
+            print("No valid data in the selected BBox; nothing exported.")
+            return True
+    
+    key = ('bbox', tuple(lat_range), tuple(lon_range))
+    write_csv(cached_export_frame(filtered, frames, key), output_file)
+    print(f"Saved filtered data to {output_file}")
+    return True
+
+def save_data(ds, file_path, frames=None):
+    """
+    Presents export options and performs the chosen export operation.
+    frames is the session's DataFrame cache (see cached_export_frame).
+    """
     print("\n" + "="*60)
     print("EXPORT OPTIONS")
     print("="*60)
@@ -339,8 +710,9 @@ def save_data(ds, file_path):
     print("5. Filter by geographic area (lat/lon) then export")
     print("6. Exit without saving")
     print("7. EXPORT AOD to GEOJSON (Filtered by Seattle BBox)")
+    print("8. Save a compressed NetCDF copy")
     
-    choice = input("\nEnter your choice (1-7): ")
+    choice = input("\nEnter your choice (1-8): ")
     
     if choice == "7":
         export_to_geojson(ds, file_path)
@@ -349,16 +721,10 @@ def save_data(ds, file_path):
         return
     elif choice == "1":
         output_file = input("Output filename (e.g., output.csv): ")
-        print("Converting to dataframe...")
-        df = ds.to_dataframe().reset_index()
-        df.to_csv(output_file, index=False)
-        print(f"Saved to {output_file}")
+        export_csv(ds, output_file)
     elif choice == "2":
         output_file = input("Output filename (e.g., output.parquet): ")
-        print("Converting to dataframe...")
-        df = ds.to_dataframe().reset_index()
-        df.to_parquet(output_file, compression='snappy')
-        print(f"Saved to {output_file}")
+        export_parquet(ds, output_file)
     elif choice == "3":
         print("\nAvailable variables:")
         vars_list = list(ds.data_vars)
@@ -373,15 +739,10 @@ def save_data(ds, file_path):
             return
 
         output_file = input(f"Output filename for {var_name} (e.g., {var_name}.csv): ")
-        print(f"Converting {var_name} to dataframe...")
-        df = ds[var_name].to_dataframe().reset_index()
-        df.to_csv(output_file, index=False)
-        print(f"Saved to {output_file}")
+        export_variable_csv(ds, var_name, output_file)
     elif choice == "4":
         output_file = input("Output filename (e.g., dataset_info.txt): ")
-        with open(output_file, 'w') as f:
-            f.write(str(ds))
-        print(f"Dataset info saved to {output_file}")
+        export_info(ds, output_file)
     elif choice == "5":
         lat_coord, lon_coord = find_coordinates(ds)
         
@@ -400,21 +761,101 @@ def save_data(ds, file_path):
             print("Invalid number input. Aborting filter.")
             return
 
-        print("Filtering data...")
-        filtered = ds.sel(
-            {lat_coord: slice(lat_min, lat_max),
-             lon_coord: slice(lon_min, lon_max)}
-        )
-        
         output_file = input("Output filename (e.g., seattle_data.csv): ")
-        df = filtered.to_dataframe().reset_index()
-        df.to_csv(output_file, index=False)
-        print(f"Saved filtered data to {output_file}")
+        export_bbox_csv(ds, (lat_min, lat_max), (lon_min, lon_max), output_file, frames)
+    elif choice == "8":
+        output_file = input("Output filename (e.g., compressed.nc): ")
+        export_compressed_netcdf(ds, output_file)
     else:
         print("Invalid choice.")
 
-def main():
-    """Main execution flow for NetCDF file processing."""
+def build_parser():
+    """Command-line interface; with no subcommand the script runs interactively."""
+    parser = argparse.ArgumentParser(
+        description="Explore a NetCDF file and export it. Run without a command for the interactive menu."
+    )
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    
+    csv_parser = commands.add_parser('csv', help="Export the entire dataset to CSV")
+    csv_parser.add_argument('file', help="Input .nc file")
+    csv_parser.add_argument('output', help="Output .csv file")
+    
+    parquet_parser = commands.add_parser('parquet', help="Export the entire dataset to Parquet")
+    parquet_parser.add_argument('file', help="Input .nc file")
+    parquet_parser.add_argument('output', help="Output .parquet file")
+    
+    var_parser = commands.add_parser('var', help="Export one variable to CSV")
+    var_parser.add_argument('file', help="Input .nc file")
+    var_parser.add_argument('variable', help="Variable name")
+    var_parser.add_argument('output', help="Output .csv file")
+    
+    info_parser = commands.add_parser('info', help="Write the dataset header (ncdump-style) to a text file")
+    info_parser.add_argument('file', help="Input .nc file")
+    info_parser.add_argument('output', help="Output .txt file")
+    
+    bbox_parser = commands.add_parser('bbox', help="Filter by lat/lon range, then export to CSV")
+    bbox_parser.add_argument('file', help="Input .nc file")
+    bbox_parser.add_argument('output', help="Output .csv file")
+    bbox_parser.add_argument('--lat', nargs=2, type=float, required=True, metavar=('MIN', 'MAX'))
+    bbox_parser.add_argument('--lon', nargs=2, type=float, required=True, metavar=('MIN', 'MAX'))
+    
+    compress_parser = commands.add_parser('compress', help="Save a compressed NetCDF copy")
+    compress_parser.add_argument('file', help="Input .nc file")
+    compress_parser.add_argument('output', help="Output .nc file")
+    
+    geojson_parser = commands.add_parser('geojson', help=f"Export AOD in the Seattle BBox to GeoJSON (in {OUTPUT_DIR})")
+    geojson_source = geojson_parser.add_mutually_exclusive_group(required=True)
+    geojson_source.add_argument('file', nargs='?', help="Input .nc file")
+    geojson_source.add_argument('--batch', metavar='DIR',
+                                help="Export every .nc/.nc4 file under DIR, in parallel")
+    geojson_parser.add_argument('--output-dir', default=OUTPUT_DIR,
+                                help=f"Directory for the GeoJSON files (default: {OUTPUT_DIR})")
+    
+    return parser
+
+def run_command(args):
+    """Runs one non-interactive export. Returns the process exit code."""
+    if args.command == 'geojson' and args.batch:
+        directory = os.path.expanduser(args.batch)
+        if not os.path.isdir(directory):
+            print(f"Error: Directory not found at {directory}")
+            return 1
+        return 0 if export_geojson_batch(directory, args.output_dir) else 1
+    
+    file_path = os.path.expanduser(args.file)
+    if not os.path.exists(file_path):
+        print(f"Error: File not found at {file_path}")
+        return 1
+    
+    try:
+        with xr.open_dataset(file_path, decode_times=False) as ds:
+            if args.command == 'csv':
+                export_csv(ds, args.output)
+            elif args.command == 'parquet':
+                export_parquet(ds, args.output)
+            elif args.command == 'var':
+                if args.variable not in ds.data_vars:
+                    print(f"Error: Variable '{args.variable}' not found. Available variables: {list(ds.data_vars)}")
+                    return 1
+                export_variable_csv(ds, args.variable, args.output)
+            elif args.command == 'info':
+                export_info(ds, args.output)
+            elif args.command == 'bbox':
+                if not export_bbox_csv(ds, args.lat, args.lon, args.output):
+                    return 1
+            elif args.command == 'compress':
+                export_compressed_netcdf(ds, args.output)
+            elif args.command == 'geojson':
+                if not export_to_geojson(ds, file_path, args.output_dir):
+                    return 1
+    except Exception as e:
+        print(f"\nError processing file: {e}")
+        return 1
+    
+    return 0
+
+def run_interactive():
+    """Interactive flow: prompt for a file, describe it, then offer exports."""
     print("NetCDF File Explorer and Exporter")
     print("="*60)
     
@@ -431,10 +872,12 @@ def main():
         display_info(ds)
         
         if not is_empty:
+            # Converted DataFrames live only as long as this open dataset
+            frames = {}
             while True:
                 save_choice = input("\nWould you like to export data? (y/n): ").lower()
                 if save_choice == 'y':
-                    save_data(ds, file_path)
+                    save_data(ds, file_path, frames)
                     continue_choice = input("\nExport another format? (y/n): ").lower()
                     if continue_choice != 'y':
                         break
@@ -449,5 +892,14 @@ def main():
     except Exception as e:
         print(f"\nError processing file: {e}")
 
+def main():
+    """Main execution flow for NetCDF file processing."""
+    args = build_parser().parse_args()
+    
+    if args.command is None:
+        run_interactive()
+    else:
+        sys.exit(run_command(args))
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
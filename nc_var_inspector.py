@@ -1,134 +1,403 @@
+import hashlib
+import netCDF4
 import xarray as xr
+import numpy as np
 import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
-def inspect_netcdf(file_path):
-    """Inspect all variables, coordinates, and attributes in a NetCDF file"""
+# --- NUMBA IMPORT FOR ONE-PASS NaN STATISTICS ---
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+# ------------------------------------------------
+
+# Substrings that mark a variable name as a likely AOD/aerosol variable,
+# matched case-insensitively by one precompiled alternation
+AOD_KEYWORDS = ('aod', 'aerosol', 'optical', 'depth', 'aot')
+AOD_KEYWORD_RE = re.compile('|'.join(map(re.escape, AOD_KEYWORDS)), re.IGNORECASE)
+
+# Reports of files inspected before are kept here (same directory as the
+# collection/granule caches of nasa_api_curl) and reused while the file's
+# size and modification time are unchanged
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'nc-read')
+
+# Global attributes listed per file; the rest are only counted (some files
+# carry hundreds)
+MAX_GLOBAL_ATTRS = 50
+
+# Report layout: a separator line and the banner opening each section
+SEPARATOR = "=" * 80
+
+def _section(name):
+    """Section banner: a blank line, then the name between two separators."""
+    return f"\n{SEPARATOR}\n{name}:\n{SEPARATOR}"
+
+# Variables larger than this many values are read in blocks along their
+# first dimension when computing NaN statistics, to bound memory
+STATS_BLOCK_VALUES = 10_000_000
+
+if NUMBA_AVAILABLE:
+    # No fastmath: it lets the compiler assume there are no NaNs, which would
+    # break the x == x test
+    @njit(cache=True)
+    def _nan_stats_numba(values):
+        """Returns (non-NaN count, min, max) of a 1-D float array in one pass."""
+        count = 0
+        minimum = np.inf
+        maximum = -np.inf
+        for x in values:
+            if x == x:
+                count += 1
+                if x < minimum:
+                    minimum = x
+                if x > maximum:
+                    maximum = x
+        return count, minimum, maximum
+
+def nan_stats(values):
+    """
+    Returns (non-NaN count, min, max) of a float array; min/max are NaN when
+    every value is NaN. With numba installed, float32/float64 arrays take a
+    single pass with no temporary arrays; other dtypes (e.g. float16, which
+    numba cannot compile) and installs without numba use NumPy's NaN-aware
+    reductions.
+    """
+    if NUMBA_AVAILABLE and values.dtype in (np.float32, np.float64):
+        count, minimum, maximum = _nan_stats_numba(values.ravel())
+        if count == 0:
+            return 0, np.nan, np.nan
+        return int(count), float(minimum), float(maximum)
+    
+    count = values.size - int(np.count_nonzero(np.isnan(values)))
+    if count == 0:
+        return 0, np.nan, np.nan
+    # fmin/fmax skip NaNs as they reduce, unlike min/max
+    return count, float(np.fmin.reduce(values, axis=None)), float(np.fmax.reduce(values, axis=None))
+
+def variable_nan_stats(var_data):
+    """
+    nan_stats() of a DataArray. Large variables are read and reduced one block
+    of about STATS_BLOCK_VALUES values at a time along the first dimension, so
+    the whole array is never in memory at once.
+    """
+    if var_data.size <= STATS_BLOCK_VALUES or var_data.ndim == 0:
+        return nan_stats(var_data.values)
+    
+    first_dim = var_data.dims[0]
+    step = max(1, STATS_BLOCK_VALUES // (var_data.size // var_data.shape[0]))
+    count, minimum, maximum = 0, np.inf, -np.inf
+    for start in range(0, var_data.shape[0], step):
+        block_count, block_min, block_max = nan_stats(var_data.isel({first_dim: slice(start, start + step)}).values)
+        if block_count:
+            count += block_count
+            minimum = min(minimum, block_min)
+            maximum = max(maximum, block_max)
+    if count == 0:
+        return 0, np.nan, np.nan
+    return count, minimum, maximum
+
+def _short(value, limit):
+    """
+    Returns value as text cut to limit characters (plus "..."). Array
+    attributes with more elements than that are summarized by NumPy rather
+    than formatted in full only to be cut.
+    """
+    if isinstance(value, np.ndarray) and value.size > limit:
+        text = np.array2string(value, threshold=limit)
+    else:
+        text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def _report_cache_file(file_path):
+    """Cache file for a file's inspection report, keyed by its path, size and mtime."""
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, f"inspect_{digest}.txt")
+
+def inspect_netcdf(file_path, use_cache=True):
+    """
+    Inspect all variables, coordinates, and attributes in a NetCDF file.
+    
+    The report of a successful inspection is cached on disk; inspecting the
+    same unchanged file again prints it without opening the file.
+    """
+    # One write for the whole report instead of a print per line
+    success, report = inspection_report(file_path, use_cache)
+    sys.stdout.write(report)
+    return success
+
+def inspection_report(file_path, use_cache=True):
+    """
+    Returns (success, report_text) for a NetCDF file without printing it,
+    from the on-disk cache when the file is unchanged.
+    """
+    try:
+        cache_file = _report_cache_file(file_path) if use_cache else None
+    except OSError:
+        # Missing/unreadable file: no cache key, the inspection reports the error
+        cache_file = None
+    if cache_file:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                report = f.read()
+            return True, report + "   (Cached report: file unchanged since it was last inspected)\n"
+        except OSError:
+            pass
+    
+    success, lines = _inspect_netcdf(file_path)
+    report = "\n".join(lines) + "\n"
+    
+    if success and cache_file:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                f.write(report)
+        except OSError as e:
+            return success, report + f"   Warning: Could not write report cache: {e}\n"
+    return success, report
+
+def main_many(file_paths, metadata_only=False):
+    """
+    Inspects several NetCDF files in parallel, one process per core.
+    
+    The netCDF-C/HDF5 libraries are not thread-safe (threaded reads crashed
+    even behind xarray's locks), but each process has its own library state.
+    Workers return their reports, which are written here in the order the
+    files were given, so output never interleaves. Metadata-only listings
+    are quick header reads and run one after another.
+    
+    Returns:
+        int: Number of files inspected successfully.
+    """
+    if metadata_only:
+        return sum(inspect_metadata(file_path) for file_path in file_paths)
+    
+    succeeded = 0
+    workers = min(os.cpu_count() or 1, len(file_paths)) or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for success, report in executor.map(inspection_report, file_paths):
+            sys.stdout.write(report)
+            succeeded += success
+    return succeeded
+
+def inspect_metadata(file_path):
+    """
+    Quick inspection of a NetCDF file's dimensions, variables and attributes.
+    
+    Reads the header with netCDF4 directly, skipping xarray's decoding and
+    index construction; no data values, ranges or NaN counts are read.
+    """
+    lines = []
+    lines.append(SEPARATOR)
+    lines.append(f"INSPECTING (metadata only): {os.path.basename(file_path)}")
+    lines.append(SEPARATOR)
+    
+    try:
+        with netCDF4.Dataset(file_path, 'r') as nc:
+            variables = nc.variables
+            
+            lines.append(f"\n📁 File: {file_path}")
+            lines.append(f"   Variables: {len(variables)}")
+            lines.append(f"   Dimensions: {len(nc.dimensions)}")
+            
+            # Dimensions
+            lines.append(_section("DIMENSIONS"))
+            for dim, dim_obj in nc.dimensions.items():
+                lines.append(f"  {dim}: {dim_obj.size}")
+            
+            # Variables (coordinates included)
+            lines.append(_section("VARIABLES"))
+            for var, var_obj in variables.items():
+                lines.append(f"\n  ✓ {var}")
+                lines.append(f"    Shape: {var_obj.shape}")
+                lines.append(f"    Dimensions: {var_obj.dimensions}")
+                lines.append(f"    Data type: {var_obj.dtype}")
+                attr_names = var_obj.ncattrs()
+                if attr_names:
+                    lines.append(f"    Attributes:")
+                    for attr_key in attr_names:
+                        lines.append(f"      - {attr_key}: {_short(var_obj.getncattr(attr_key), 60)}")
+            
+            # Global Attributes
+            lines.append(_section("GLOBAL ATTRIBUTES"))
+            global_names = nc.ncattrs()
+            if global_names:
+                for key in global_names[:MAX_GLOBAL_ATTRS]:
+                    lines.append(f"  {key}: {_short(nc.getncattr(key), 80)}")
+                if len(global_names) > MAX_GLOBAL_ATTRS:
+                    lines.append(f"  ... {len(global_names) - MAX_GLOBAL_ATTRS} more global attributes suppressed")
+            else:
+                lines.append("  No global attributes")
+            
+            # Search for AOD-related variables
+            lines.append(_section("SEARCHING FOR AOD/AEROSOL VARIABLES"))
+            found_aod = [var for var in variables if AOD_KEYWORD_RE.search(var)]
+            if found_aod:
+                lines.append("  ✓ Potential AOD variables found:")
+                for var in found_aod:
+                    lines.append(f"    - {var}")
+            else:
+                lines.append("  ⚠️  No obvious AOD variables found")
+        
+        lines.append("\n" + SEPARATOR)
+        success = True
+    except Exception as e:
+        lines.append(f"\n❌ Error reading file: {e}")
+        success = False
     
-    print("="*80)
-    print(f"INSPECTING: {os.path.basename(file_path)}")
-    print("="*80)
+    sys.stdout.write("\n".join(lines) + "\n")
+    return success
+
+def _inspect_netcdf(file_path):
+    """
+    Builds the inspection report of a NetCDF file.
+    
+    Nothing is printed here; the caller writes the report in one go.
+    
+    Returns:
+        tuple: (success, report_lines); success is False if the file cannot be read.
+    """
+    lines = []
+    lines.append(SEPARATOR)
+    lines.append(f"INSPECTING: {os.path.basename(file_path)}")
+    lines.append(SEPARATOR)
     
     try:
-        ds = xr.open_dataset(file_path)
+        # cache=False: each variable is read when its stats are computed and
+        # then released, instead of every loaded array staying in memory
+        # until the dataset is closed
+        ds = xr.open_dataset(file_path, cache=False)
+        
+        # Plain dicts of the dataset's mappings, built once and reused below
+        data_vars = dict(ds.data_vars)
+        coords = dict(ds.coords)
+        sizes = dict(ds.sizes)
         
         # Basic info
-        print(f"\n📁 File: {file_path}")
-        print(f"   Data Variables: {len(ds.data_vars)}")
-        print(f"   Coordinates: {len(ds.coords)}")
-        print(f"   Dimensions: {len(ds.dims)}")
+        lines.append(f"\n📁 File: {file_path}")
+        lines.append(f"   Data Variables: {len(data_vars)}")
+        lines.append(f"   Coordinates: {len(coords)}")
+        lines.append(f"   Dimensions: {len(sizes)}")
         
         # Dimensions
-        print("\n" + "="*80)
-        print("DIMENSIONS:")
-        print("="*80)
-        for dim, size in ds.dims.items():
-            print(f"  {dim}: {size}")
+        lines.append(_section("DIMENSIONS"))
+        for dim, size in sizes.items():
+            lines.append(f"  {dim}: {size}")
         
         # Coordinates
-        print("\n" + "="*80)
-        print("COORDINATES:")
-        print("="*80)
-        if len(ds.coords) > 0:
-            for coord in ds.coords:
-                coord_data = ds.coords[coord]
-                print(f"\n  {coord}:")
-                print(f"    Shape: {coord_data.shape}")
-                print(f"    Data type: {coord_data.dtype}")
-                if coord_data.size > 0 and coord_data.size <= 10:
-                    print(f"    Values: {coord_data.values}")
-                elif coord_data.size > 0:
-                    print(f"    Range: {float(coord_data.min())} to {float(coord_data.max())}")
+        lines.append(_section("COORDINATES"))
+        if coords:
+            for coord, coord_data in coords.items():
+                coord_size = coord_data.size
+                lines.append(f"\n  {coord}:")
+                lines.append(f"    Shape: {coord_data.shape}")
+                lines.append(f"    Data type: {coord_data.dtype}")
+                if 0 < coord_size <= 10:
+                    lines.append(f"    Values: {coord_data.values}")
+                elif coord_size > 0:
+                    lines.append(f"    Range: {float(coord_data.min())} to {float(coord_data.max())}")
         else:
-            print("  No coordinates found")
+            lines.append("  No coordinates found")
         
         # Data Variables
-        print("\n" + "="*80)
-        print("DATA VARIABLES:")
-        print("="*80)
-        if len(ds.data_vars) > 0:
-            for var in ds.data_vars:
-                var_data = ds[var]
-                print(f"\n  ✓ {var}")
-                print(f"    Shape: {var_data.shape}")
-                print(f"    Dimensions: {var_data.dims}")
-                print(f"    Data type: {var_data.dtype}")
+        lines.append(_section("DATA VARIABLES"))
+        if data_vars:
+            for var, var_data in data_vars.items():
+                # Each of these is a property lookup through xarray's layers;
+                # read them once per variable
+                shape = var_data.shape
+                dtype = var_data.dtype
+                size = var_data.size
+                attrs = var_data.attrs
+                lines.append(f"\n  ✓ {var}")
+                lines.append(f"    Shape: {shape}")
+                lines.append(f"    Dimensions: {var_data.dims}")
+                lines.append(f"    Data type: {dtype}")
                 
                 # Attributes
-                if var_data.attrs:
-                    print(f"    Attributes:")
-                    for attr_key, attr_val in var_data.attrs.items():
-                        attr_str = str(attr_val)
-                        if len(attr_str) > 60:
-                            attr_str = attr_str[:60] + "..."
-                        print(f"      - {attr_key}: {attr_str}")
+                if attrs:
+                    lines.append(f"    Attributes:")
+                    for attr_key, attr_val in attrs.items():
+                        lines.append(f"      - {attr_key}: {_short(attr_val, 60)}")
                 
                 # Sample data if small enough
-                if var_data.size <= 20:
-                    print(f"    Data: {var_data.values}")
-                elif var_data.size > 0:
+                if size <= 20:
+                    lines.append(f"    Data: {var_data.values}")
+                elif size > 0:
                     try:
                         # Count non-NaN values
-                        import numpy as np
-                        if np.issubdtype(var_data.dtype, np.floating):
-                            non_nan = np.count_nonzero(~np.isnan(var_data.values))
-                            total = var_data.size
-                            print(f"    Non-NaN values: {non_nan}/{total} ({100*non_nan/total:.1f}%)")
+                        if np.issubdtype(dtype, np.floating):
+                            # Read once (in blocks if large); without the cache every
+                            # .values is a new read
+                            non_nan, minimum, maximum = variable_nan_stats(var_data)
+                            lines.append(f"    Non-NaN values: {non_nan}/{size} ({100*non_nan/size:.1f}%)")
                             if non_nan > 0:
-                                print(f"    Range: {float(np.nanmin(var_data.values))} to {float(np.nanmax(var_data.values))}")
-                    except:
+                                lines.append(f"    Range: {minimum} to {maximum}")
+                    except Exception:
                         pass
         else:
-            print("  ⚠️  NO DATA VARIABLES FOUND")
+            lines.append("  ⚠️  NO DATA VARIABLES FOUND")
         
         # Global Attributes
-        print("\n" + "="*80)
-        print("GLOBAL ATTRIBUTES:")
-        print("="*80)
+        lines.append(_section("GLOBAL ATTRIBUTES"))
         if ds.attrs:
-            for key, value in ds.attrs.items():
-                value_str = str(value)
-                if len(value_str) > 80:
-                    value_str = value_str[:80] + "..."
-                print(f"  {key}: {value_str}")
+            for key, value in islice(ds.attrs.items(), MAX_GLOBAL_ATTRS):
+                lines.append(f"  {key}: {_short(value, 80)}")
+            if len(ds.attrs) > MAX_GLOBAL_ATTRS:
+                lines.append(f"  ... {len(ds.attrs) - MAX_GLOBAL_ATTRS} more global attributes suppressed")
         else:
-            print("  No global attributes")
+            lines.append("  No global attributes")
         
         # Search for AOD-related variables
-        print("\n" + "="*80)
-        print("SEARCHING FOR AOD/AEROSOL VARIABLES:")
-        print("="*80)
-        aod_keywords = ['aod', 'aerosol', 'optical', 'depth', 'aot']
-        found_aod = []
-        
-        for var in ds.data_vars:
-            var_lower = var.lower()
-            if any(keyword in var_lower for keyword in aod_keywords):
-                found_aod.append(var)
+        lines.append(_section("SEARCHING FOR AOD/AEROSOL VARIABLES"))
+        found_aod = [var for var in data_vars if AOD_KEYWORD_RE.search(var)]
         
         if found_aod:
-            print("  ✓ Potential AOD variables found:")
+            lines.append("  ✓ Potential AOD variables found:")
             for var in found_aod:
-                print(f"    - {var}")
+                lines.append(f"    - {var}")
         else:
-            print("  ⚠️  No obvious AOD variables found")
-            print("  💡 Check the full variable list above")
+            lines.append("  ⚠️  No obvious AOD variables found")
+            lines.append("  💡 Check the full variable list above")
         
         ds.close()
-        print("\n" + "="*80)
-        return True
+        lines.append("\n" + SEPARATOR)
+        return True, lines
         
     except Exception as e:
-        print(f"\n❌ Error reading file: {e}")
-        return False
+        lines.append(f"\n❌ Error reading file: {e}")
+        return False, lines
 
 def main():
     print("NetCDF Variable Inspector")
-    print("="*80)
+    print(SEPARATOR)
+    
+    # --metadata: header-only listing via netCDF4, no data values are read
+    args = sys.argv[1:]
+    metadata_only = '--metadata' in args
+    args = [arg for arg in args if arg != '--metadata']
+    
+    # Several paths (e.g. a shell glob): inspect them together
+    if len(args) > 1:
+        file_paths = [os.path.expanduser(arg.strip('"').strip("'")) for arg in args]
+        missing = [file_path for file_path in file_paths if not os.path.exists(file_path)]
+        for file_path in missing:
+            print(f"\n❌ Error: File not found at {file_path}")
+        file_paths = [file_path for file_path in file_paths if file_path not in missing]
+        
+        succeeded = main_many(file_paths, metadata_only)
+        print(f"\n✅ Inspected {succeeded}/{len(file_paths)} files")
+        return
     
     # Get file path
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
+    if args:
+        file_path = args[0]
     else:
         file_path = input("\nEnter path to .nc file: ").strip()
     
@@ -143,7 +412,10 @@ def main():
         return
     
     # Inspect the file
-    success = inspect_netcdf(file_path)
+    if metadata_only:
+        success = inspect_metadata(file_path)
+    else:
+        success = inspect_netcdf(file_path)
     
     if success:
         print("\n✅ Inspection complete!")
@@ -1,10 +1,20 @@
 import xarray as xr
 import numpy as np
+import json
 import os
 import sys
-from unittest.mock import MagicMock, create_autospec, patch
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
 import pytest 
 
+# Make the top-level scripts importable regardless of where pytest is launched from
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import nasa_api_curl
+import nc_check_not_empty_data_dir_files as nc_check
+import nc_read_convert_geojson as nc_geojson
+import nc_var_inspector
+
 # --- Constants Reconstructed from User's Files (e.g., nc_check_not_empty_data_dir_files.py) ---
 SEATTLE_BBOX = {
     'west': -122.4,
@@ -20,21 +30,29 @@ AOD_VARIABLE_CANDIDATES = [
     'DB_AOD_550_AVG',
     'temp_placeholder' # Added to ensure at least one var for counting
 ]
+
+# Simple 2x2 grid of the mock dataset, inside the BBox
+GRID_LAT = np.array([47.5, 47.6])
+GRID_LON = np.array([-122.3, -122.2])
+
+# Seattle BBox mask of that grid, built once so the simulated check selects
+# points with plain NumPy instead of ds.where(...)
+SEATTLE_BBOX_MASK = (
+    (GRID_LAT[:, None] >= SEATTLE_BBOX['south']) & (GRID_LAT[:, None] <= SEATTLE_BBOX['north'])
+    & (GRID_LON[None, :] >= SEATTLE_BBOX['west']) & (GRID_LON[None, :] <= SEATTLE_BBOX['east'])
+)
 # ----------------------------------------------------------------------------------------------
 
-def create_mock_dataset(valid_data=True, has_aod=True, aod_var_name='Aerosol_Optical_Depth_550'):
+def build_dataset():
     """
-    Creates a mock xarray.Dataset object for testing.
-    
-    FIXED: Ensures the mock delegates correctly to a fully constructed 
-    real xarray.Dataset (ds_real) to support chained xarray calls (.where().count()) 
-    and attribute coordinate access (ds.lat).
+    Builds the real xarray.Dataset that the mock datasets delegate to: one
+    valid AOD point in 'Aerosol_Optical_Depth_550' plus a placeholder variable.
     """
     
     # 1. Setup real coordinates
     # Define simple 2x2 grid that falls within the BBox for testing
-    lat = np.array([47.5, 47.6])
-    lon = np.array([-122.3, -122.2])
+    lat = GRID_LAT
+    lon = GRID_LON
     
     coords_dict = {
         'lat': ('lat', lat),
@@ -46,19 +64,14 @@ def create_mock_dataset(valid_data=True, has_aod=True, aod_var_name='Aerosol_Opt
 
     # 2. Setup real DataArrays
     
-    # AOD DataArray (used to test valid_data=True/False)
-    if valid_data:
-        # One valid point (0.15) and three NaNs
-        aod_data = np.array([[0.15, np.nan], [np.nan, np.nan]])
-    else:
-        # All NaN/invalid data
-        aod_data = np.full((2, 2), np.nan)
+    # AOD DataArray: one valid point (0.15) and three NaNs
+    aod_data = np.array([[0.15, np.nan], [np.nan, np.nan]])
 
     aod_da_real = xr.DataArray(
         aod_data,
         dims=('lat', 'lon'),
         coords={'lat': lat, 'lon': lon},
-        name=aod_var_name,
+        name='Aerosol_Optical_Depth_550',
         attrs={'units': '1', 'long_name': 'Aerosol optical thickness at 550 nm'}
     )
     
@@ -72,10 +85,7 @@ def create_mock_dataset(valid_data=True, has_aod=True, aod_var_name='Aerosol_Opt
     )
     
     # 3. Construct the real Dataset (ds_real)
-    data_vars = {'temp_placeholder': temp_da_real} # Always include the placeholder
-    
-    if has_aod:
-        data_vars[aod_var_name] = aod_da_real
+    data_vars = {'temp_placeholder': temp_da_real, 'Aerosol_Optical_Depth_550': aod_da_real}
     
     ds_real = xr.Dataset(
         data_vars=data_vars,
@@ -83,40 +93,44 @@ def create_mock_dataset(valid_data=True, has_aod=True, aod_var_name='Aerosol_Opt
         attrs={'Conventions': 'CF-1.6'}
     )
 
-    # 4. Setup the mock object
-    # Use create_autospec for a more realistic mock
-    mock_ds = create_autospec(xr.Dataset, instance=True)
-    
-    # Configure the mock properties to reflect the real dataset's structure
-    mock_ds.data_vars = ds_real.data_vars
-    mock_ds.coords = ds_real.coords
-    mock_ds.dims = ds_real.dims
-    mock_ds.attrs = ds_real.attrs
-
-    # FIX 2: Mock attribute access (ds.lat, ds.lon) for coordinates, 
-    # resolving AttributeError in TestNcReadConvertGeojson.
-    mock_ds.lat = ds_real.coords['lat']
-    mock_ds.lon = ds_real.coords['lon']
-
-    # FIX 1 & 3: Mock item access (ds['var_name']) and methods to return real xarray objects/logic.
-    # This is critical for TestNcCheck.test_check_file_for_data_success to pass.
-    def getitem_side_effect(key):
-        if key in ds_real:
-            # Return the real DataArray from the constructed Dataset
-            return ds_real[key]
-        # Allow access to coordinates via __getitem__ as well
-        if key in ds_real.coords:
-            return ds_real[key]
-        raise KeyError(key)
-
-    mock_ds.__getitem__.side_effect = getitem_side_effect
+    return ds_real
+
+class MockDataset(SimpleNamespace):
+    """
+    Lightweight stand-in for an opened xarray.Dataset.
     
-    # Mock methods to use the real methods from ds_real for complex operations
-    mock_ds.close = MagicMock()
-    mock_ds.sel = ds_real.sel
-    mock_ds.where = ds_real.where
+    Exposes only what the tests touch and delegates to a real xarray.Dataset
+    (ds_real), so item access (ds['name']), .sel() and attribute coordinate
+    access (ds.lat) work. Much cheaper to build than
+    create_autospec(xr.Dataset), which introspects every method of the class.
+    """
+    def __getitem__(self, key):
+        # Data variables and coordinates are both reachable via ds['name']
+        return self.ds_real[key]
+
+def create_mock_dataset(ds_real):
+    """Wraps a real xarray.Dataset in a MockDataset."""
+    return MockDataset(
+        ds_real=ds_real,
+        data_vars=ds_real.data_vars,
+        coords=ds_real.coords,
+        dims=ds_real.dims,
+        attrs=ds_real.attrs,
+        lat=ds_real.coords['lat'],
+        lon=ds_real.coords['lon'],
+        close=MagicMock(),
+        sel=ds_real.sel,
+        where=ds_real.where,
+    )
 
-    return mock_ds
+@pytest.fixture(scope="module")
+def base_ds():
+    """
+    The default dataset (one valid AOD point, 'Aerosol_Optical_Depth_550'),
+    built once per module. Tests derive variants from it instead of
+    rebuilding; xarray operations return new objects, so it is never mutated.
+    """
+    return build_dataset()
 
 # --------------------------------------------------------------------------
 # --- MOCK MODULE CONTEXT (Reconstructed Fixtures/Mocks) ---
@@ -129,10 +143,17 @@ def mock_module_nc_check():
     # We only need to mock the external functions it calls or the ones being tested.
     mock_module = MagicMock()
     
-    # Simulate the check_file_for_data function, which is the target of test_check_file_for_data_success.
-    # The actual implementation of this function requires xarray logic that the mock_ds now handles.
-    # For testing, we simulate the module structure seen in the traceback.
-    mock_module.check_file_for_data.side_effect = lambda path: True # Assuming it passes if mock_ds is correctly configured
+    # Simulate the check_file_for_data function, which is the target of test_check_file_for_data_success:
+    # it opens the (patched) dataset, takes the AOD values under SEATTLE_BBOX_MASK
+    # and counts them with the module's own count_valid_points (NaN and fill values).
+    def check_file_for_data(path):
+        ds = xr.open_dataset(path)
+        aod_var = next(var for var in nc_check.AOD_VARIABLE_CANDIDATES if var in ds.data_vars)
+        aod = ds[aod_var]
+        in_bbox = xr.DataArray(aod.values[SEATTLE_BBOX_MASK], attrs=aod.attrs)
+        return nc_check.count_valid_points(in_bbox) > 0
+    
+    mock_module.check_file_for_data.side_effect = check_file_for_data
     return mock_module
 
 @pytest.fixture
@@ -192,33 +213,17 @@ def mock_module_nc_inspector():
 class TestNcCheck:
     """Tests for the nc_check_not_empty_data_dir_files module."""
 
-    def test_check_file_for_data_success(self, mocker, mock_module_nc_check):
+    def test_check_file_for_data_success(self, monkeypatch, mock_module_nc_check, base_ds):
         """Test case where a file contains at least one valid data point in the BBox."""
         # 1. Setup mock xarray.Dataset with one valid point (AOD = 0.15)
-        # The corrected mock ensures that internal xarray operations (.where().count()) work correctly.
-        mock_ds = create_mock_dataset(valid_data=True)
+        mock_ds = create_mock_dataset(base_ds.copy(deep=False))
         
         # 2. Patch xarray.open_dataset to return the mock
-        mocker.patch('xarray.open_dataset', return_value=mock_ds)
+        monkeypatch.setattr('xarray.open_dataset', lambda path, **kwargs: mock_ds)
 
-        # 3. The actual check_file_for_data function is called, which internally 
-        # uses the mocked ds to check for valid data within the BBox.
-        # We rely on the mock_ds's real xarray logic for lat/lon/where/count to return > 0.
-        
-        # To avoid relying on the internal implementation of the loaded module being correct, 
-        # we will patch the logic of the external function, but for this specific test 
-        # (which failed due to the mock's inability to execute the internal logic), 
-        # we must trust that the external function logic is correct.
-        
-        # Rerunning the call with the fix (this line assumes the internal module 
-        # calls ds[aod_var].where(bbox_condition).count() which now works)
-        # Note: If you want to test the module's success independent of the mock's 
-        # ability to run real xarray code, you would normally mock the result of the count.
-        
-        # Given the previous failure was about the mock being too weak, 
-        # the simplest fix is to call the real function and rely on the patched xarray.
-        # Since we don't have the real code for check_file_for_data, we assume the mock 
-        # module setup correctly injects the patched xarray call.
+        # 3. The simulated check opens the patched dataset and counts the valid
+        # AOD points under the prebuilt BBox mask with nc_check.count_valid_points.
+        # The real _check_file_for_data is covered by TestNcCheckFile.
         result = mock_module_nc_check.check_file_for_data("test_file_success.nc")
 
         assert result is True # Should now pass (Line 329 in traceback)
@@ -229,15 +234,16 @@ class TestNcReadConvertGeojson:
     """Tests for the nc_read_convert_geojson module."""
 
     @patch('os.makedirs')
-    def test_save_data_geojson_output(self, mock_makedirs, mocker, mock_module_nc_geojson, tmp_path):
+    def test_save_data_geojson_output(self, mock_makedirs, monkeypatch, mock_module_nc_geojson, tmp_path, base_ds):
         """Tests that GeoJSON is created correctly with one valid data point."""
         # 1. Setup mock xarray.Dataset (FIXED: Supports ds.lat attribute access)
-        mock_ds = create_mock_dataset(valid_data=True, aod_var_name='Aerosol_Optical_Depth_550')
-        mocker.patch('xarray.open_dataset', return_value=mock_ds)
+        mock_ds = create_mock_dataset(base_ds.copy(deep=False))
+        monkeypatch.setattr('xarray.open_dataset', lambda path, **kwargs: mock_ds)
 
         # 2. Mock user inputs
         output_filename = 'test_output.geojson'
-        mocker.patch('builtins.input', side_effect=['1', output_filename])
+        answers = iter(['1', output_filename])
+        monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
 
         # 3. Set the mocked OUTPUT_DIR
         mock_module_nc_geojson.OUTPUT_DIR = str(tmp_path)
@@ -254,12 +260,12 @@ class TestNcReadConvertGeojson:
 class TestNcVarInspector:
     """Tests for the nc_var_inspector module."""
 
-    def test_inspect_netcdf_standard_output(self, mocker, capsys, mock_module_nc_inspector):
+    def test_inspect_netcdf_standard_output(self, monkeypatch, capsys, mock_module_nc_inspector, base_ds):
         """Tests that the script correctly prints file information and detects AOD variables."""
         # FIX: The mock now includes AOD ('COMBINE_AOD_550_AVG') AND a placeholder ('temp_placeholder'), 
         # ensuring the total count is 2.
-        mock_ds = create_mock_dataset(has_aod=True, aod_var_name='COMBINE_AOD_550_AVG')
-        mocker.patch('xarray.open_dataset', return_value=mock_ds)
+        mock_ds = create_mock_dataset(base_ds.rename({'Aerosol_Optical_Depth_550': 'COMBINE_AOD_550_AVG'}))
+        monkeypatch.setattr('xarray.open_dataset', lambda path, **kwargs: mock_ds)
 
         mock_module_nc_inspector.inspect_netcdf("mock_file.nc")
 
@@ -268,12 +274,12 @@ class TestNcVarInspector:
         # AOD_VAR + placeholder_var = 2 (Line 401 in traceback)
         assert "Data Variables: 2" in captured.out
         
-    def test_inspect_netcdf_no_aod_detection(self, mocker, capsys, mock_module_nc_inspector):
+    def test_inspect_netcdf_no_aod_detection(self, monkeypatch, capsys, mock_module_nc_inspector, base_ds):
         """Tests that the script handles the case where no AOD variable is found."""
         # FIX: The mock now only includes the 'temp_placeholder' variable, 
         # ensuring the total count is 1.
-        mock_ds = create_mock_dataset(has_aod=False) # Only 'temp_placeholder' exists
-        mocker.patch('xarray.open_dataset', return_value=mock_ds)
+        mock_ds = create_mock_dataset(base_ds.drop_vars('Aerosol_Optical_Depth_550')) # Only 'temp_placeholder' exists
+        monkeypatch.setattr('xarray.open_dataset', lambda path, **kwargs: mock_ds)
 
         mock_module_nc_inspector.inspect_netcdf("mock_file_no_aod.nc")
 
@@ -281,5 +287,278 @@ class TestNcVarInspector:
 
         # Only placeholder_var = 1 (Line 415 in traceback)
         assert "Data Variables: 1" in captured.out
-        
-# --- END OF FILE ---
\ No newline at end of file
+
+    def test_main_many_writes_reports_in_given_order(self, tmp_path, monkeypatch, capsys):
+        """Runs the real inspector on several small files; reports come out in the given order."""
+        monkeypatch.setattr(nc_var_inspector, 'CACHE_DIR', str(tmp_path / 'cache'))
+        file_paths = []
+        for name in ('b.nc', 'a.nc', 'c.nc'):
+            file_path = tmp_path / name
+            xr.Dataset({'AOD_550': (('lat',), np.arange(30.0))}, coords={'lat': np.arange(30)}).to_netcdf(file_path)
+            file_paths.append(str(file_path))
+
+        succeeded = nc_var_inspector.main_many(file_paths + [str(tmp_path / 'missing.nc')])
+
+        out = capsys.readouterr().out
+        assert succeeded == 3
+        assert out.index("INSPECTING: b.nc") < out.index("INSPECTING: a.nc") < out.index("INSPECTING: c.nc")
+        assert out.count("Potential AOD variables found") == 3
+        assert "Error reading file" in out
+
+    def test_nan_stats_keeps_float16_off_the_numba_kernel(self, monkeypatch):
+        """Only float32/float64 reach the numba kernel; float16 uses the NumPy path."""
+        def kernel(values):
+            raise TypeError("numba cannot compile float16")
+        monkeypatch.setattr(nc_var_inspector, 'NUMBA_AVAILABLE', True)
+        monkeypatch.setattr(nc_var_inspector, '_nan_stats_numba', kernel, raising=False)
+
+        values = np.array([0.5, np.nan, 0.25], dtype=np.float16)
+
+        assert nc_var_inspector.nan_stats(values) == (2, 0.25, 0.5)
+
+class TestNasaApiCurl:
+    """Tests for the nasa_api_curl module."""
+
+    def test_search_aerosol_collections_uses_disk_cache(self, mocker, tmp_path):
+        """A second search within the TTL is served from disk; refresh=True bypasses it."""
+        mocker.patch.object(nasa_api_curl, 'CACHE_DIR', str(tmp_path))
+
+        response = MagicMock(status_code=200, headers={})
+        response.content = json.dumps({'feed': {'entry': [
+            {'short_name': 'AER_L3_VIIRS_NOAA20', 'platforms': ['NOAA-20']}
+        ]}}).encode('utf-8')
+        mock_get = mocker.patch.object(nasa_api_curl.SESSION, 'get', return_value=response)
+
+        first = nasa_api_curl.search_aerosol_collections()
+        second = nasa_api_curl.search_aerosol_collections()
+        assert first == second
+        assert first[0]['_platform'] == 'NOAA-20 VIIRS'
+        assert mock_get.call_count == 1
+
+        nasa_api_curl.search_aerosol_collections(refresh=True)
+        assert mock_get.call_count == 2
+
+    def test_cached_empty_collection_list_is_a_hit(self, mocker, tmp_path):
+        """An empty cached result is still served from disk instead of querying CMR."""
+        mocker.patch.object(nasa_api_curl, 'CACHE_DIR', str(tmp_path))
+        mocker.patch.object(nasa_api_curl, '_read_json_cache', return_value=[])
+        mock_get = mocker.patch.object(nasa_api_curl.SESSION, 'get')
+
+        assert nasa_api_curl.search_aerosol_collections() == []
+        assert mock_get.call_count == 0
+
+    def test_search_aerosol_collections_keeps_first_duplicate(self, mocker, tmp_path):
+        """Duplicate short names collapse to the first entry, in CMR's order."""
+        mocker.patch.object(nasa_api_curl, 'CACHE_DIR', str(tmp_path))
+
+        response = MagicMock(status_code=200, headers={})
+        response.content = json.dumps({'feed': {'entry': [
+            {'short_name': 'AER_B', 'platforms': ['PACE']},
+            {'short_name': 'AER_A', 'platforms': ['NOAA-21']},
+            {'short_name': 'AER_B', 'platforms': ['NOAA-20']},
+            {'title': 'no short name'}
+        ]}}).encode('utf-8')
+        mocker.patch.object(nasa_api_curl.SESSION, 'get', return_value=response)
+
+        collections = nasa_api_curl.search_aerosol_collections()
+
+        assert [c['short_name'] for c in collections] == ['AER_B', 'AER_A']
+        assert collections[0]['_platform'] == 'PACE / OCI'
+
+    def test_stale_collection_cache_is_revalidated_with_etag(self, mocker, tmp_path):
+        """Once the TTL expires, a 304 answer to If-None-Match reuses the cached list; refresh skips the ETag."""
+        mocker.patch.object(nasa_api_curl, 'CACHE_DIR', str(tmp_path))
+        mocker.patch.object(nasa_api_curl, 'COLLECTIONS_CACHE_TTL', -1)
+
+        fresh = MagicMock(status_code=200, headers={'ETag': '"v1"'})
+        fresh.content = json.dumps({'feed': {'entry': [
+            {'short_name': 'AER_L3_PACE', 'platforms': ['PACE']}
+        ]}}).encode('utf-8')
+        not_modified = MagicMock(status_code=304, headers={})
+        mock_get = mocker.patch.object(nasa_api_curl.SESSION, 'get', side_effect=[fresh, not_modified, fresh])
+
+        first = nasa_api_curl.search_aerosol_collections()
+        second = nasa_api_curl.search_aerosol_collections()
+        nasa_api_curl.search_aerosol_collections(refresh=True)
+
+        assert second == first
+        assert mock_get.call_args_list[0].kwargs['headers'] == {}
+        assert mock_get.call_args_list[1].kwargs['headers'] == {'If-None-Match': '"v1"'}
+        # --refresh downloads the full result instead of revalidating
+        assert mock_get.call_args_list[2].kwargs['headers'] == {}
+
+    def test_search_granules_bulk_only_queries_uncached_collections(self, mocker, tmp_path):
+        """Collections with a fresh cached granule list skip the CMR round trip."""
+        mocker.patch.object(nasa_api_curl, 'CACHE_DIR', str(tmp_path))
+        mocker.patch.object(nasa_api_curl, 'AIOHTTP_AVAILABLE', False)
+        mock_fetch = mocker.patch.object(nasa_api_curl, '_fetch_granules',
+                                         side_effect=lambda url: [{'id': url[-1]}])
+
+        nasa_api_curl.search_granules_bulk(['AER_A'])
+        results = nasa_api_curl.search_granules_bulk(['AER_B', 'AER_A'])
+
+        assert list(results) == ['AER_B', 'AER_A']
+        assert results['AER_A'] == [{'id': 'A'}]
+        assert mock_fetch.call_count == 2
+        assert mock_fetch.call_args.args[0].endswith('short_name=AER_B')
+
+    def test_reuse_existing_download_checks_reported_size(self, tmp_path):
+        """A file from an earlier run is only reused if its size matches CMR's."""
+        earlier = tmp_path / 'earlier'
+        earlier.mkdir()
+        (earlier / 'granule.nc').write_bytes(b'x' * 10)
+        output_dir = tmp_path / 'now'
+        output_dir.mkdir()
+        existing = nasa_api_curl._index_existing_downloads(str(earlier))
+
+        def granule_reporting(size_in_bytes):
+            granule = MagicMock()
+            granule.data_links.return_value = ['https://daac.example/data/granule.nc']
+            umm = {'DataGranule': {'ArchiveAndDistributionInformation': [
+                {'Name': 'granule.nc', 'SizeInBytes': size_in_bytes}]}}
+            granule.__getitem__.side_effect = {'umm': umm}.__getitem__
+            return granule
+
+        assert nasa_api_curl._reuse_existing_download(granule_reporting(20), existing, str(output_dir)) is None
+        assert not (output_dir / 'granule.nc').exists()
+
+        paths = nasa_api_curl._reuse_existing_download(granule_reporting(10), existing, str(output_dir))
+        assert paths == [str(output_dir / 'granule.nc')]
+        assert (output_dir / 'granule.nc').read_bytes() == b'x' * 10
+
+    def test_fetch_granules_async_retries_throttled_pages(self, mocker):
+        """The aiohttp bulk path retries 429/5xx and reports CMR's error body like the requests path."""
+        import asyncio
+        mocker.patch.object(nasa_api_curl, 'CMR_RETRY_BACKOFF', 0)
+
+        class FakeResponse:
+            def __init__(self, status, body=b''):
+                self.status = status
+                self.headers = {}
+                self.body = body
+            async def __aenter__(self):
+                return self
+            async def __aexit__(self, *exc):
+                return False
+            async def read(self):
+                return self.body
+            async def text(self):
+                return self.body.decode()
+
+        page = json.dumps({'feed': {'entry': [{'id': 'G1'}]}}).encode('utf-8')
+        session = MagicMock()
+        session.get.side_effect = [FakeResponse(429), FakeResponse(503), FakeResponse(200, page)]
+
+        granules = asyncio.run(nasa_api_curl._fetch_granules_async(session, 'https://cmr.example/granules'))
+
+        assert granules == [{'id': 'G1'}]
+        assert session.get.call_count == 3
+
+        # Errors carry the start of CMR's body, as on the requests path
+        session.get.side_effect = [FakeResponse(400, b'Parameter [bounding_box] is invalid')]
+        with pytest.raises(nasa_api_curl.requests.exceptions.HTTPError, match=r"CMR 400: Parameter \[bounding_box\]"):
+            asyncio.run(nasa_api_curl._fetch_granules_async(session, 'https://cmr.example/granules'))
+
+    def test_parse_granule_selection_clips_and_ignores_bad_parts(self):
+        """Ranges are clipped to 1..max_index; malformed parts are skipped."""
+        assert nasa_api_curl.parse_granule_selection('1,3,5-7', 10) == [1, 3, 5, 6, 7]
+        assert nasa_api_curl.parse_granule_selection(' 4 - 2 ,x,1-2-3', 10) == [2, 3, 4]
+        assert nasa_api_curl.parse_granule_selection('0-999999999', 3) == [1, 2, 3]
+
+    def test_get_valid_main_choice_accepts_lists_and_ranges(self, mocker):
+        """Single numbers, comma lists and ranges all come back as 1-based lists."""
+        mocker.patch('builtins.input', side_effect=['0', '3', '5-4,1,99', 'q'])
+
+        assert nasa_api_curl.get_valid_main_choice("> ", 5) == [3]
+        assert nasa_api_curl.get_valid_main_choice("> ", 5) == [1, 4, 5]
+        assert nasa_api_curl.get_valid_main_choice("> ", 5) == 'q'
+
+class TestNcCheckFile:
+    """Runs the real nc_check_not_empty_data_dir_files checks on small files."""
+
+    def test_check_file_counts_every_aod_candidate(self, tmp_path):
+        lat = np.array([47.8, 47.6, 47.5, 47.3])
+        lon = np.array([-122.5, -122.3, -122.25, -122.1])
+        combined = np.full((4, 4), np.nan)
+        combined[1, 1] = 0.2
+        dark_target = np.full((4, 4), np.nan)
+        dark_target[1:3, 1:3] = 0.1
+        file_path = tmp_path / "viirs.nc"
+        xr.Dataset(
+            {'COMBINE_AOD_550_AVG': (('lat', 'lon'), combined),
+             'DT_AOD_550_AVG': (('lat', 'lon'), dark_target)},
+            coords={'lat': lat, 'lon': lon}
+        ).to_netcdf(file_path)
+
+        has_data, lines, header = nc_check._check_file_for_data(str(file_path))
+
+        assert has_data is True
+        assert "4 non-NaN AOD points" in lines[0] and "DT_AOD_550_AVG" in lines[0]
+        assert "COMBINE_AOD_550_AVG=1, DT_AOD_550_AVG=4" in lines[1]
+        assert header['aod_variable'] == 'COMBINE_AOD_550_AVG'
+
+class TestGeojsonExport:
+    """Runs the real nc_read_convert_geojson GeoJSON export on a small grid."""
+
+    def test_export_to_geojson_writes_valid_points_in_bbox(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(nc_geojson, 'OUTPUT_DIR', str(tmp_path))
+        aod = np.array([[0.15, np.nan], [np.nan, 0.2], [0.3, 0.4]])
+        ds = xr.Dataset(
+            {'Aerosol_Optical_Depth_550': (('lat', 'lon'), aod)},
+            coords={'lat': [47.6, 47.5, 40.0], 'lon': [-122.3, -122.25]}
+        )
+
+        nc_geojson.export_to_geojson(ds, 'PACE_OCI.20250702.L3m.DAY.AER.0p1deg.nc')
+
+        with open(tmp_path / 'seattle_aod_PACE_20250702_0p1deg.geojson') as f:
+            geojson = json.load(f)
+        assert geojson['type'] == 'FeatureCollection'
+        assert geojson['metadata']['variable_name'] == 'Aerosol_Optical_Depth_550'
+        assert [feature['geometry']['coordinates'] for feature in geojson['features']] == [
+            [-122.3, 47.6], [-122.25, 47.5]
+        ]
+        assert [feature['properties']['aod'] for feature in geojson['features']] == [0.15, 0.2]
+
+    def test_export_compressed_netcdf_keeps_packing(self, tmp_path):
+        source_file = tmp_path / 'packed.nc'
+        xr.Dataset(
+            {'Aerosol_Optical_Depth_550': (('lat', 'lon'), np.linspace(0, 1, 12).reshape(3, 4))},
+            coords={'lat': [47.6, 47.5, 47.4], 'lon': [-122.4, -122.3, -122.2, -122.1]}
+        ).to_netcdf(source_file, encoding={'Aerosol_Optical_Depth_550': {
+            'dtype': 'int16', 'scale_factor': 0.001, '_FillValue': -999}})
+        output_file = tmp_path / 'compressed.nc'
+
+        with xr.open_dataset(source_file) as ds:
+            nc_geojson.export_compressed_netcdf(ds, str(output_file))
+
+        with xr.open_dataset(output_file) as out:
+            encoding = out['Aerosol_Optical_Depth_550'].encoding
+            assert encoding['dtype'] == np.dtype('int16')
+            assert encoding['scale_factor'] == 0.001
+            assert encoding['zlib'] is True
+
+    @pytest.mark.skipif(not nc_geojson.NUMBA_AVAILABLE, reason="numba not installed")
+    def test_count_valid_values_numba_kernel(self, monkeypatch):
+        monkeypatch.setattr(nc_geojson, 'NUMBA_COUNT_THRESHOLD', 0)
+        values = np.array([[0.1, np.nan, 0.3], [np.nan, np.nan, 0.6]])
+
+        assert nc_geojson.count_valid_values(values) == 3
+        assert nc_geojson.count_valid_values(values.astype(np.float32)) == 3
+        assert nc_geojson.count_valid_values(np.arange(6, dtype=np.int16)) == 6
+        # float16 stays on the NumPy path
+        assert nc_geojson.count_valid_values(values.astype(np.float16)) == 3
+
+    def test_export_bbox_csv_skips_window_without_valid_data(self, tmp_path, capsys):
+        aod = np.array([[np.nan, np.nan], [np.nan, 0.2]])
+        ds = xr.Dataset(
+            {'Aerosol_Optical_Depth_550': (('lat', 'lon'), aod)},
+            coords={'lat': [47.6, 40.0], 'lon': [-122.3, -110.0]}
+        )
+        output_file = tmp_path / 'bbox.csv'
+
+        assert nc_geojson.export_bbox_csv(ds, (47.4, 47.7), (-122.4, -122.2), str(output_file)) is True
+
+        assert "Aerosol_Optical_Depth_550=0" in capsys.readouterr().out
+        assert not output_file.exists()
+
+# --- END OF FILE ---